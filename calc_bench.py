@@ -0,0 +1,274 @@
+"""Headless benchmark suite.
+
+Runs without a display and prints (or writes) one JSON document::
+
+    python calc_bench.py                      # print results
+    python calc_bench.py -o bench.json        # save them
+    python calc_bench.py --baseline bench.json --tolerance 0.25
+
+Measured:
+
+* ``keystroke``  per-key latency of the scientific keypad (``Keypad.press``
+  plus the idle preview the GUI runs after it), as percentiles in µs;
+* ``eval``       parse+compile rate, and ``_eval_safe`` throughput on an
+  expression corpus with the result and compile caches cleared before every
+  evaluation (cold) and with both kept (warm);
+* ``convert``    scalar conversions per second as done by each converter page
+  (unit pages by category, temperature, numeral);
+* ``startup``    import time of calc_core / calculator_GUI in a fresh
+  interpreter, ``App()`` construction time, and the build time and widget
+  count of a ScientificPage (skipped without a display).
+
+The exit status is 1 when a result breaks an absolute limit in THRESHOLDS
+or is more than *tolerance* worse than the baseline file.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from calc_core import (Keypad, ExprBuffer, compile_expr, UNITS, TEMPERATURE_UNITS,
+                       NUMERAL_BASES, convert_unit, convert_temperature, convert_numeral)
+
+
+# (metric path, "max" or "min", limit).  Loose enough for slow CI machines;
+# the baseline comparison is what catches small regressions.
+THRESHOLDS = [
+    ("keystroke.p99_us",    "max", 2000.0),
+    ("eval.cold_per_sec",   "min", 2000.0),
+    ("eval.warm_per_sec",   "min", 50000.0),
+    ("startup.core_import_ms", "max", 150.0),
+]
+
+# Metrics where a larger number is better; everything else is a cost.
+_HIGHER_IS_BETTER = ("per_sec",)
+# Counts and single worst samples are not compared against the baseline.
+_NOT_COMPARED = {"n", "corpus", "size", "maxsize", "hits", "misses",
+                 "evictions", "hit_rate", "max_us"}
+
+EXPRESSIONS = [
+    "1+2", "3.5*4-2/7", "(1+2)*(3+4)/(5-6)", "2^10", "2**0.5", "sin(30)+cos(60)",
+    "tan(45)*ln(e)", "√(2)+∛(27)", "log(1000)*π", "5!+3!", "asin(0.5)",
+    "((((1+2)*3)+4)*5)", "1/3+1/6", "-(-3)^2", "exp(1)-e", "abs(-5)*gamma(5)",
+    "+".join(str(i) for i in range(200)), "*".join(["1.0001"] * 100),
+]
+
+KEY_SCRIPTS = [
+    "12+34×5=", "sin 30 =", "2 xʸ 10 =", "( 1 + 2 ) × 3 − 4 ÷ 5 =",
+    "7 x! = ± % MS C MR + 1 =", "9 √ = x² 1/x =", "π × 2 = Ans ÷ 4 =",
+    "123456789 × 987654321 =", "1 ⌫ 2 ⌫ 3 + 4 ⌫ 5 =",
+]
+
+
+def _percentiles(samples):
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {"n": len(s), "p50_us": pick(0.50) * 1e6, "p90_us": pick(0.90) * 1e6,
+            "p99_us": pick(0.99) * 1e6, "max_us": s[-1] * 1e6}
+
+
+def _keys(script):
+    out = []
+    for tok in script.split():
+        # multi-character labels are single keys; runs of digits are typed
+        out.extend(tok if tok.isdigit() else [tok])
+    return out
+
+
+def bench_keystroke(rounds):
+    timer = time.perf_counter
+    samples = []
+    for mode in ("DEG", "RAD"):
+        pad = Keypad()
+        pad.angle_mode = mode
+        for _ in range(rounds):
+            for script in KEY_SCRIPTS:
+                for key in _keys(script):
+                    t0 = timer()
+                    pad.press(key)
+                    if pad.preview_due: pad.preview()
+                    samples.append(timer() - t0)
+                pad.press("C")
+    return _percentiles(samples)
+
+
+def _rate(fn, items, min_time):
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        for it in items:
+            fn(it)
+        n += len(items)
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            return n / dt
+
+
+def bench_eval(min_time):
+    bufs = {e: ExprBuffer.of([(e, e)]) for e in EXPRESSIONS}
+
+    def run(pad, cold=False):
+        def one(expr):
+            if cold:
+                compile_expr.cache_clear()  # parse and fold every time
+            pad.buf = bufs[expr]
+            pad._eval_safe(silent=True)
+        return one
+    def parse(expr):
+        compile_expr.cache_clear()
+        compile_expr(expr)
+    cold = Keypad(cache_size=0)
+    warm = Keypad()
+    return {"corpus": len(EXPRESSIONS),
+            "compile_per_sec": _rate(parse, EXPRESSIONS, min_time),
+            "cold_per_sec": _rate(run(cold, cold=True), EXPRESSIONS, min_time),
+            "warm_per_sec": _rate(run(warm), EXPRESSIONS, min_time),
+            "warm_cache": warm.cache.stats()}
+
+
+def bench_convert(min_time, n=2000):
+    rnd = random.Random(1)
+    values = [str(rnd.uniform(-1e6, 1e6)) for _ in range(n)]
+    out = {}
+    for cat, table in UNITS.items():
+        units = list(table)
+        pairs = [(v, units[i % len(units)], units[(i * 7 + 3) % len(units)])
+                 for i, v in enumerate(values)]
+        # what _UnitPage._calc does for one click
+        out[cat] = _rate(lambda p: round(convert_unit(float(p[0]), cat, p[1], p[2]), 8),
+                         pairs, min_time)
+    pairs = [(v, TEMPERATURE_UNITS[i % 3], TEMPERATURE_UNITS[(i + 1) % 3])
+             for i, v in enumerate(values)]
+    out["temperature"] = _rate(
+        lambda p: round(convert_temperature(float(p[0]), p[1], p[2]), 4), pairs, min_time)
+    bases = list(NUMERAL_BASES)
+    nums = [(str(rnd.getrandbits(64)), bases[i % len(bases)]) for i in range(n)]
+    out["numeral"] = _rate(lambda p: convert_numeral(p[0], "Decimal", p[1]), nums, min_time)
+    return {f"{k}_per_sec": v for k, v in out.items()}
+
+
+def _import_ms(module, repeat=3):
+    code = ("import time; t=time.perf_counter(); import %s; "
+            "print((time.perf_counter()-t)*1e3)" % module)
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = math.inf
+    for _ in range(repeat):
+        r = subprocess.run([sys.executable, "-c", code], cwd=here,
+                           capture_output=True, text=True)
+        if r.returncode:
+            raise RuntimeError(f"importing {module} failed:\n{r.stderr}")
+        best = min(best, float(r.stdout))
+    return best
+
+
+def _widget_count(w):
+    return 1 + sum(_widget_count(c) for c in w.winfo_children())
+
+
+def bench_startup():
+    out = {"core_import_ms": _import_ms("calc_core"),
+           "gui_import_ms": _import_ms("calculator_GUI"),
+           "app_ms": None, "sci_page_ms": None, "sci_widgets": None}
+    import calculator_GUI                   # a broken import is a failure
+    try:
+        t0 = time.perf_counter()
+        app = calculator_GUI.App()
+        app.update()
+        out["app_ms"] = (time.perf_counter() - t0) * 1e3
+        t0 = time.perf_counter()
+        page = calculator_GUI.ScientificPage(app, app)
+        app.update_idletasks()
+        out["sci_page_ms"] = (time.perf_counter() - t0) * 1e3
+        out["sci_widgets"] = _widget_count(page)
+        page.destroy()
+        app.destroy()
+    except calculator_GUI.tk.TclError:
+        pass                                # no display: skipped
+    return out
+
+
+def run(quick=False):
+    t = 0.05 if quick else 0.5
+    return {
+        "meta": {"python": platform.python_version(),
+                 "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "keystroke": bench_keystroke(5 if quick else 50),
+        "eval": bench_eval(t),
+        "convert": bench_convert(t),
+        "startup": bench_startup(),
+    }
+
+
+def _lookup(results, path):
+    node = results
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node if isinstance(node, (int, float)) else None
+
+
+def _metrics(results, prefix=""):
+    for k, v in results.items():
+        if k == "meta": continue
+        if isinstance(v, dict):
+            yield from _metrics(v, f"{prefix}{k}.")
+        elif isinstance(v, (int, float)) and k not in _NOT_COMPARED:
+            yield f"{prefix}{k}"
+
+
+def check(results, baseline=None, tolerance=0.25):
+    """List of human-readable regressions (empty when everything passes)."""
+    bad = []
+    for path, kind, limit in THRESHOLDS:
+        v = _lookup(results, path)
+        if v is None: continue
+        if (v > limit) if kind == "max" else (v < limit):
+            bad.append(f"{path} = {v:.4g} (limit {kind} {limit:g})")
+    if baseline:
+        for path in _metrics(results):
+            new, old = _lookup(results, path), _lookup(baseline, path)
+            if new is None or not old: continue
+            higher = path.endswith(_HIGHER_IS_BETTER)
+            worse = (old - new) / old if higher else (new - old) / old
+            if worse > tolerance:
+                bad.append(f"{path} = {new:.4g} vs baseline {old:.4g} "
+                           f"({worse:.0%} worse)")
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="calc_bench", description="Headless benchmarks.")
+    ap.add_argument("-o", "--output", help="write the JSON here instead of stdout")
+    ap.add_argument("--baseline", help="earlier JSON output to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed relative slowdown against the baseline")
+    ap.add_argument("--quick", action="store_true", help="short runs (smoke test)")
+    args = ap.parse_args(argv)
+
+    results = run(args.quick)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    results["regressions"] = check(results, baseline, args.tolerance)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for line in results["regressions"]:
+        print("REGRESSION:", line, file=sys.stderr)
+    return 1 if results["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
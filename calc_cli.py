@@ -0,0 +1,191 @@
+"""Command-line batch converter.
+
+Streams a CSV or newline-delimited file through one of the calculator's
+converters without building any GUI::
+
+    python calc_cli.py length km mile readings.csv -c 2 -o miles.csv
+    python calc_cli.py temperature Fahrenheit Celsius - < temps.txt
+    python calc_cli.py unit "L/100km" mpg consumption.csv
+    python calc_cli.py numeral Hexadecimal Decimal dump.txt
+    python calc_cli.py numeral Hexadecimal Decimal big.hex --whole -o big.txt
+    python calc_cli.py age today years members.csv -c 3 --append --skip-header
+
+Rows are read in fixed-size chunks, the selected column is converted as a
+whole and the chunk is written out before the next one is read, so memory
+stays bounded regardless of input size.  Values that cannot be converted
+are written as empty fields.  With ``--whole`` the entire input is one
+(arbitrarily long) number.  Throughput is reported on stderr.
+"""
+import argparse
+import csv
+import math
+import sys
+import time
+from datetime import date
+from itertools import islice
+
+from calc_core import (UNITS, TEMPERATURE_UNITS, NUMERAL_BASES,
+                       conversion, convert_unit_array, convert_temperature_many,
+                       convert_numeral, convert_numeral_file, parse_date,
+                       parse_dates, age_array, NO_DATE)
+
+
+CONVERTERS = sorted(UNITS) + ["unit", "temperature", "numeral", "age"]
+
+# age: FROM is the reference date ("today" or YYYY-MM-DD), TO the output
+AGE_OUTPUTS = ("years", "months", "days", "ymd")
+
+
+def _parse_floats(col):
+    out = []
+    for s in col:
+        try:
+            out.append(float(s))
+        except ValueError:
+            out.append(math.nan)
+    return out
+
+
+def _fmt_floats(vals):
+    return ["" if v != v else repr(v) for v in vals]
+
+
+def make_converter(kind, frm, to, width=None):
+    """Return a function mapping a list of input strings to output strings."""
+    if kind in UNITS:
+        table = UNITS[kind]
+        for u in (frm, to):
+            if u not in table:
+                raise ValueError(f"unknown {kind} unit {u!r}; "
+                                 f"choose from {', '.join(table)}")
+        return lambda col: _fmt_floats(
+            convert_unit_array(_parse_floats(col), kind, frm, to).tolist())
+    if kind == "unit":
+        a, b, inverse = conversion(frm, to)         # any compatible pair
+        if inverse:
+            return lambda col: _fmt_floats([a / v if v else math.nan
+                                            for v in _parse_floats(col)])
+        return lambda col: _fmt_floats([v * a + b for v in _parse_floats(col)])
+    if kind == "temperature":
+        for u in (frm, to):
+            if u not in TEMPERATURE_UNITS:
+                raise ValueError(f"unknown temperature unit {u!r}; "
+                                 f"choose from {', '.join(TEMPERATURE_UNITS)}")
+        return lambda col: _fmt_floats(
+            convert_temperature_many(_parse_floats(col), frm, to))
+    if kind == "numeral":
+        for u in (frm, to):
+            if u not in NUMERAL_BASES:
+                raise ValueError(f"unknown base {u!r}; "
+                                 f"choose from {', '.join(NUMERAL_BASES)}")
+
+        def conv(col):
+            out = []
+            for s in col:
+                try:
+                    out.append(convert_numeral(s.strip(), frm, to, width))
+                except (ValueError, OverflowError):
+                    out.append("")
+            return out
+        return conv
+    if kind == "age":
+        ref = date.today() if frm == "today" else parse_date(frm)
+        if to not in AGE_OUTPUTS:
+            raise ValueError(f"unknown age output {to!r}; "
+                             f"choose from {', '.join(AGE_OUTPUTS)}")
+
+        t = (ref - date(1970, 1, 1)).days
+
+        def conv(col):
+            days = parse_dates(col)
+            if to == "days":
+                return ["" if v == NO_DATE or v > t else str(t - v)
+                        for v in days.tolist()]
+            y, m, d = (c.tolist() for c in age_array(days, ref))
+            if to == "years":
+                return ["" if v < 0 else str(v) for v in y]
+            if to == "months":
+                return ["" if v < 0 else str(v * 12 + w) for v, w in zip(y, m)]
+            return ["" if v < 0 else f"{v}y{w}m{x}d" for v, w, x in zip(y, m, d)]
+        return conv
+    raise ValueError(f"unknown converter {kind!r}")
+
+
+def convert_stream(src, dst, convert, column=0, delimiter=",",
+                   skip_header=False, append=False, chunk_rows=65536):
+    """Convert *column* of every row from *src* to *dst*; returns the row count."""
+    reader = csv.reader(src, delimiter=delimiter)
+    writer = csv.writer(dst, delimiter=delimiter, lineterminator="\n")
+    if skip_header:
+        header = next(reader, None)
+        if header is not None:
+            writer.writerow(header + ["converted"] if append else header)
+    rows = 0
+    while True:
+        chunk = list(islice(reader, chunk_rows))
+        if not chunk:
+            return rows
+        col = [r[column] if len(r) > column else "" for r in chunk]
+        res = convert(col)
+        for r, v in zip(chunk, res):
+            if append:
+                r.append(v)
+            elif len(r) > column:
+                r[column] = v
+        writer.writerows(chunk)
+        rows += len(chunk)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        prog="calc_cli", description="Stream a file through a calculator converter.")
+    ap.add_argument("converter", choices=CONVERTERS)
+    ap.add_argument("frm", metavar="FROM")
+    ap.add_argument("to", metavar="TO")
+    ap.add_argument("input", nargs="?", default="-",
+                    help="CSV or newline-delimited file ('-' for stdin)")
+    ap.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    ap.add_argument("-c", "--column", type=int, default=0, help="0-based column to convert")
+    ap.add_argument("-d", "--delimiter", default=",")
+    ap.add_argument("--skip-header", action="store_true", help="copy the first row through")
+    ap.add_argument("--append", action="store_true",
+                    help="add the result as a new column instead of replacing")
+    ap.add_argument("--chunk-rows", type=int, default=65536)
+    ap.add_argument("--bits", type=int, help="numeral: two's-complement width")
+    ap.add_argument("--whole", action="store_true",
+                    help="numeral: the whole input is one number")
+    args = ap.parse_args(argv)
+
+    try:
+        convert = make_converter(args.converter, args.frm, args.to, args.bits)
+    except ValueError as ex:
+        ap.error(str(ex))
+    if args.whole and args.converter != "numeral":
+        ap.error("--whole only applies to the numeral converter")
+
+    src = dst = None
+    t0 = time.perf_counter()
+    try:
+        src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+        dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        if args.whole:
+            rows = convert_numeral_file(src, dst, args.frm, args.to, args.bits)
+            unit = "digits"
+        else:
+            rows = convert_stream(src, dst, convert, args.column, args.delimiter,
+                                  args.skip_header, args.append, args.chunk_rows)
+            unit = "rows"
+    except (ValueError, OverflowError, OSError) as ex:
+        print(f"calc_cli: {ex}", file=sys.stderr)
+        return 1
+    finally:
+        if src not in (None, sys.stdin): src.close()
+        if dst not in (None, sys.stdout): dst.close()
+    dt = time.perf_counter() - t0
+    print(f"{rows} {unit} in {dt:.3f}s ({rows / dt if dt else 0:,.0f} {unit}/sec)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
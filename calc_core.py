@@ -0,0 +1,2363 @@
+"""Headless calculation core for the Smart Calculator.
+
+Everything here is plain Python with no tkinter dependency: the expression
+engine, the scientific keypad state machine, and the unit, temperature,
+numeral, date, BMI and discount conversions.  Each conversion has a batch
+``*_many`` variant taking sequences.  ``calculator_GUI`` is a thin view
+over this module.  NumPy is used for array conversions when installed.
+"""
+import decimal
+import math
+import operator
+import re
+from array import array
+from collections import OrderedDict, namedtuple
+from datetime import date
+from fractions import Fraction
+from functools import lru_cache
+
+from calc_profile import instrument
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  EXPRESSION ENGINE
+# ════════════════════════════════════════════════════════════════════════════
+# Expressions are tokenized, parsed into a small tuple AST and compiled into a
+# closure tree.  Only the operators and names below are accepted; anything
+# else is a SyntaxError.  Compiled callables are cached per (text, angle mode,
+# exact).  Besides ``x`` the name ``ans`` is a variable, so callers can refer
+# to a previous result without turning it into digits.
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*(?:⁻¹)?|[π√∛Γ])
+  | (?P<op>\*\*|[-+*/^()×÷−!])
+""", re.VERBOSE)
+
+_OP_ALIASES = {"^": "**", "×": "*", "÷": "/", "−": "-"}
+
+_CONSTS = {"pi": math.pi, "π": math.pi, "e": math.e}
+
+_FUNC_ALIASES = {"sin⁻¹": "asin", "cos⁻¹": "acos", "tan⁻¹": "atan",
+                 "√": "sqrt", "∛": "cbrt", "log10": "log", "Γ": "gamma"}
+
+_FLOAT_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul,
+              "/": operator.truediv, "**": operator.pow}
+
+
+def tokenize(text):
+    """Split *text* into a list of ``(kind, value, start)`` tuples."""
+    toks = []
+    pos, n = 0, len(text)
+    while pos < n:
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise SyntaxError(f"Unexpected {text[pos]!r}")
+        kind = m.lastgroup
+        if kind != "ws":
+            val = m.group(kind)
+            if kind == "op":
+                val = _OP_ALIASES.get(val, val)
+            toks.append((kind, val, pos))
+        pos = m.end()
+    return toks
+
+
+class _Parser:
+    """Recursive-descent parser producing a tuple AST.
+
+    ``+ -`` and ``* /`` runs are flattened into one ``chain`` node so that
+    long pasted sums do not nest (and recurse) once per operator.
+    """
+
+    def __init__(self, toks):
+        self.toks = toks
+        self.i = 0
+        self.has_var = False
+
+    def _peek(self):
+        return self.toks[self.i][1] if self.i < len(self.toks) else None
+
+    def _take(self, val=None):
+        if self.i >= len(self.toks):
+            raise SyntaxError("Unexpected end of expression")
+        tok = self.toks[self.i]
+        if val is not None and tok[1] != val:
+            raise SyntaxError(f"Expected {val!r}")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self._expr()
+        if self.i != len(self.toks):
+            raise SyntaxError(f"Unexpected {self.toks[self.i][1]!r}")
+        return node
+
+    def _chain(self, ops, operand):
+        first = operand()
+        rest = []
+        while self._peek() in ops and self.toks[self.i][0] == "op":
+            op = self._take()[1]
+            rest.append((op, operand()))
+        return ("chain", first, tuple(rest)) if rest else first
+
+    def _expr(self):
+        return self._chain(("+", "-"), self._term)
+
+    def _term(self):
+        return self._chain(("*", "/"), self._unary)
+
+    def _unary(self):
+        if self._peek() in ("-", "+"):
+            op = self._take()[1]
+            node = self._unary()
+            return ("neg", node) if op == "-" else node
+        return self._power()
+
+    def _power(self):
+        base = self._postfix()
+        if self._peek() == "**":
+            self._take()
+            return ("pow", base, self._unary())
+        return base
+
+    def _postfix(self):
+        node = self._atom()
+        while self._peek() == "!" and self.toks[self.i][0] == "op":
+            self._take()
+            node = ("call", "fact", node)
+        return node
+
+    def _atom(self):
+        kind, val, _ = self._take()
+        if kind == "num":
+            return ("num", val)
+        if kind == "op":
+            if val != "(":
+                raise SyntaxError(f"Unexpected {val!r}")
+            node = self._expr()
+            self._take(")")
+            return node
+        if val in _CONSTS:
+            return ("const", val)
+        if val in ("x", "ans"):
+            self.has_var = True
+            return ("var", val)
+        name = _FUNC_ALIASES.get(val, val)
+        if name not in FUNCTIONS:
+            raise SyntaxError(f"Unknown name {val!r}")
+        if val in ("√", "∛") and self._peek() != "(":
+            return ("call", name, self._unary())
+        self._take("(")
+        arg = self._expr()
+        self._take(")")
+        return ("call", name, arg)
+
+
+def parse(text):
+    """Parse *text* into an AST; returns ``(ast, uses_vars)``."""
+    p = _Parser(tokenize(text))
+    return p.parse(), p.has_var
+
+
+def _cbrt(x):
+    return math.copysign(abs(x) ** (1 / 3), x)
+
+
+FUNCTIONS = ("sin", "cos", "tan", "asin", "acos", "atan",
+             "log", "ln", "sqrt", "cbrt", "exp", "abs", "gamma", "fact")
+
+
+@lru_cache(maxsize=None)
+def _float_funcs(angle_mode):
+    if angle_mode == "DEG":
+        to_r, from_r = math.radians, math.degrees
+    elif angle_mode == "GRAD":
+        to_r, from_r = (lambda x: x * math.pi / 200), (lambda x: x * 200 / math.pi)
+    else:
+        to_r = from_r = None
+
+    def fwd(f): return f if to_r is None else (lambda x: f(to_r(x)))
+    def inv(f): return f if from_r is None else (lambda x: from_r(f(x)))
+
+    return {"sin": fwd(math.sin), "cos": fwd(math.cos), "tan": fwd(math.tan),
+            "asin": inv(math.asin), "acos": inv(math.acos), "atan": inv(math.atan),
+            "log": math.log10, "ln": math.log, "sqrt": math.sqrt,
+            "cbrt": _cbrt, "exp": math.exp, "abs": abs,
+            "gamma": _float_result(gamma), "fact": _float_result(factorial)}
+
+
+# Exact mode keeps integers and fractions.Fraction values exact; constants
+# and transcendental functions fall back to float.  Powers whose result would
+# exceed EXACT_MAX_BITS (about 1.2 million decimal digits) raise OverflowError
+# instead of tying up the interpreter.
+EXACT_MAX_BITS = 1 << 22
+
+
+def _norm(v):
+    """Collapse integral Fractions to int."""
+    if isinstance(v, Fraction) and v.denominator == 1:
+        return v.numerator
+    return v
+
+
+def _exact_num(text):
+    return _norm(Fraction(text))
+
+
+def _exact_div(a, b):
+    if isinstance(a, (int, Fraction)) and isinstance(b, (int, Fraction)):
+        return _norm(Fraction(a) / b)
+    return a / b
+
+
+def _exact_pow(a, b):
+    b = _norm(b)
+    if isinstance(b, int) and isinstance(a, (int, Fraction)):
+        a = Fraction(a)
+        size = a.numerator.bit_length() + a.denominator.bit_length() - 1
+        if abs(b) * (size - 1) > EXACT_MAX_BITS:
+            raise OverflowError("Result too large")
+        return _norm(a ** b)
+    r = float(a) ** float(b)
+    if isinstance(r, complex):
+        raise ValueError("math domain error")
+    return r
+
+
+def _exact_sqrt(x):
+    if isinstance(x, int) and x >= 0:
+        r = math.isqrt(x)
+        if r * r == x:
+            return r
+    return math.sqrt(x)
+
+
+_EXACT_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul,
+              "/": _exact_div, "**": _exact_pow}
+
+
+@lru_cache(maxsize=None)
+def _exact_funcs(angle_mode):
+    funcs = {k: (lambda f: lambda x: f(float(x)))(f)
+             for k, f in _float_funcs(angle_mode).items()}
+    funcs["sqrt"] = _exact_sqrt
+    funcs["abs"]  = abs
+    funcs["fact"] = _float_result(lambda x: factorial(x, exact=True))
+    return funcs
+
+
+# exact flag -> (literal parser, operator table, function table factory)
+_BACKENDS = {False: (float, _FLOAT_OPS, _float_funcs),
+             True:  (_exact_num, _EXACT_OPS, _exact_funcs)}
+
+
+def _build(node, num, ops, funcs):
+    """Compile an AST node into a closure ``f(x, ans)``."""
+    kind = node[0]
+    if kind == "num":
+        v = num(node[1])
+        return lambda x, a: v
+    if kind == "const":
+        v = _CONSTS[node[1]]
+        return lambda x, a: v
+    if kind == "var":
+        return (lambda x, a: x) if node[1] == "x" else (lambda x, a: a)
+    if kind == "neg":
+        f = _build(node[1], num, ops, funcs)
+        return lambda x, a: -f(x, a)
+    if kind == "call":
+        fn, f = funcs[node[1]], _build(node[2], num, ops, funcs)
+        return lambda x, a: fn(f(x, a))
+    if kind == "pow":
+        p = ops["**"]
+        b, e = _build(node[1], num, ops, funcs), _build(node[2], num, ops, funcs)
+        return lambda x, a: p(b(x, a), e(x, a))
+    first = _build(node[1], num, ops, funcs)
+    rest = [(ops[op], _build(n, num, ops, funcs)) for op, n in node[2]]
+
+    def chain(x, a):
+        acc = first(x, a)
+        for op, f in rest:
+            acc = op(acc, f(x, a))
+        return acc
+    return chain
+
+
+@lru_cache(maxsize=512)
+def compile_expr(text, angle_mode="DEG", exact=False):
+    """Compile *text* into a callable ``f(x=0.0, ans=0)``.
+
+    Expressions without variables are folded to their value at compile time,
+    so a cache hit costs one call.
+    """
+    ast, uses_vars = parse(text)
+    num, ops, funcs = _BACKENDS[exact]
+    fn = _build(ast, num, ops, funcs(angle_mode))
+    if exact:
+        inner = fn
+        fn = lambda x, a: _norm(inner(x, a))
+    if uses_vars:
+        return lambda x=0.0, ans=0: fn(x, ans)
+    val = fn(0.0, 0)
+    return lambda x=0.0, ans=0: val
+
+
+def evaluate(text, angle_mode="DEG", x=0.0, exact=False, ans=0):
+    return compile_expr(text, angle_mode, exact)(x, ans)
+
+
+# Operator-stack entries used by IncrementalEvaluator.  Prefix operators
+# (unary minus, bare √/∛) sit between * / and ** like in _Parser.
+_PREC = {"+": 1, "-": 1, "*": 2, "/": 2, "neg": 3, "pre": 3, "**": 4}
+
+
+class IncrementalEvaluator:
+    """Live-preview evaluator that keeps work from the previous call.
+
+    The expression is scanned with an immediately-reducing operator stack.
+    The value and operator stacks are immutable cons lists, so the state
+    after every token is kept at no copying cost.  When the text changes,
+    only tokens past the common prefix with the previous text are rescanned;
+    appending a key costs one token plus the final reduction.
+    """
+
+    # A token may be re-lexed by up to two following characters ("1e" + "+5",
+    # "*" + "*", "sin" + "⁻¹"), so states that close to the edit are dropped.
+    _LOOKAHEAD = 2
+
+    def __init__(self):
+        self._key = None
+        self._ans = None
+        self._text = ""
+        self._ends = []
+        self._states = []
+
+    def reset(self):
+        self._text = ""
+        self._ends = []
+        self._states = []
+
+    def evaluate(self, text, angle_mode="DEG", exact=False, ans=0):
+        """Return the value of *text*; raise if it is not a complete expression."""
+        key = (angle_mode, exact)
+        if key != self._key or ans is not self._ans:
+            self._key, self._ans = key, ans
+            num, self._ops, funcs = _BACKENDS[exact]
+            self._num, self._funcs = num, funcs(angle_mode)
+            self.reset()
+        old = self._text
+        if text.startswith(old):
+            common = len(old)
+        elif old.startswith(text):
+            common = len(text)
+        else:
+            n = min(len(old), len(text))
+            common = 0
+            while common < n and old[common] == text[common]:
+                common += 1
+        keep = len(self._ends)
+        while keep and self._ends[keep - 1] >= common - self._LOOKAHEAD:
+            keep -= 1
+        del self._ends[keep:], self._states[keep:]
+        self._text = text
+        state = self._states[-1] if keep else (None, None, True)
+        pos = self._ends[-1] if keep else 0
+
+        while pos < len(text):
+            m = _TOKEN_RE.match(text, pos)
+            if m is None:
+                raise SyntaxError(f"Unexpected {text[pos]!r}")
+            pos = m.end()
+            kind = m.lastgroup
+            if kind == "ws":
+                continue
+            val = m.group(kind)
+            if kind == "op":
+                val = _OP_ALIASES.get(val, val)
+            state = self._step(state, kind, val)
+            self._ends.append(pos)
+            self._states.append(state)
+        return _norm(self._finish(state))
+
+    def _apply(self, op, vals):
+        b, vals = vals
+        if op[0] == "neg":
+            return (-b, vals)
+        if op[0] in ("pre", "call"):
+            return (self._funcs[op[1]](b), vals)
+        a, vals = vals
+        return (self._ops[op[0]](a, b), vals)
+
+    def _step(self, state, kind, val):
+        vals, ops, want_operand = state
+        if ops is not None and ops[0][0] == "call" and val != "(":
+            if not ops[0][2]:               # only √ and ∛ work without "("
+                raise SyntaxError("Expected '('")
+            ops = (("pre", ops[0][1]), ops[1])
+        if want_operand:
+            if kind == "num":
+                return ((self._num(val), vals), ops, False)
+            if kind == "name":
+                if val in _CONSTS:
+                    return ((_CONSTS[val], vals), ops, False)
+                if val == "ans":
+                    return ((self._ans, vals), ops, False)
+                name = _FUNC_ALIASES.get(val, val)
+                if name not in FUNCTIONS:
+                    raise SyntaxError(f"Unknown name {val!r}")
+                return (vals, (("call", name, val in ("√", "∛")), ops), True)
+            if val == "(":
+                return (vals, (("(",), ops), True)
+            if val == "-":
+                return (vals, (("neg",), ops), True)
+            if val == "+":
+                return state
+            raise SyntaxError(f"Unexpected {val!r}")
+        if kind != "op" or val == "(":
+            raise SyntaxError(f"Unexpected {val!r}")
+        if val == "!":
+            return ((self._funcs["fact"](vals[0]), vals[1]), ops, False)
+        if val == ")":
+            while ops is not None and ops[0][0] != "(":
+                vals, ops = self._apply(ops[0], vals), ops[1]
+            if ops is None:
+                raise SyntaxError("Unexpected ')'")
+            ops = ops[1]
+            if ops is not None and ops[0][0] == "call":
+                vals, ops = self._apply(ops[0], vals), ops[1]
+            return (vals, ops, False)
+        prec = _PREC[val]
+        while ops is not None and ops[0][0] in _PREC:
+            top = _PREC[ops[0][0]]
+            if top < prec or (top == prec and val == "**"):
+                break
+            vals, ops = self._apply(ops[0], vals), ops[1]
+        return (vals, ((val,), ops), True)
+
+    def _finish(self, state):
+        vals, ops, want_operand = state
+        if want_operand:
+            raise SyntaxError("Unexpected end of expression")
+        while ops is not None:
+            if ops[0][0] in ("(", "call"):
+                raise SyntaxError("Unexpected end of expression")
+            vals, ops = self._apply(ops[0], vals), ops[1]
+        return vals[0]
+
+
+def evaluate_many(texts, angle_mode="DEG"):
+    """Evaluate each expression in *texts*; invalid ones yield ``None``."""
+    out = []
+    for t in texts:
+        try:
+            out.append(float(compile_expr(t, angle_mode)()))
+        except Exception:
+            out.append(None)
+    return out
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy is optional and imported on first use to keep import time low."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def to_rad(x, angle_mode):
+    if angle_mode == "DEG":  return math.radians(x)
+    if angle_mode == "GRAD": return x * math.pi / 200
+    return x
+
+
+def from_rad(x, angle_mode):
+    if angle_mode == "DEG":  return math.degrees(x)
+    if angle_mode == "GRAD": return x * 200 / math.pi
+    return x
+
+
+@instrument()
+def fmt(val):
+    if isinstance(val, Magnitude):
+        return _log_summary(val.sign, val.log10)
+    if isinstance(val, int):
+        return str(val) if abs(val) < 10**15 else _int_summary(val)
+    if isinstance(val, Fraction):
+        n, d = val.numerator, val.denominator
+        if abs(n) < 10**15 and d < 10**15:
+            return f"{n}/{d}"
+        try:
+            return fmt(float(val))
+        except OverflowError:
+            return _int_summary(n // d)
+    if not math.isfinite(val):
+        return str(val)
+    if val == int(val) and abs(val) < 1e15:
+        return str(int(val))
+    return f"{val:.10g}"
+
+
+def _int_summary(n, sig=10):
+    """Leading digits and exponent of *n* without a full decimal conversion."""
+    if n.bit_length() <= 1000:
+        return f"{float(n):.{sig}g}"
+    m = abs(n)
+    shift = m.bit_length() - 64
+    return _log_summary(-1 if n < 0 else 1,
+                        math.log10(m >> shift) + shift * math.log10(2), sig)
+
+
+def _log_summary(sign, lg, sig=10):
+    """Format ``sign * 10**lg`` as mantissa and exponent."""
+    sign = "-" if sign < 0 else ""
+    if lg >= 1e15:
+        # The exponent itself is only known approximately.
+        return f"{sign}10^{lg:.{sig}g}"
+    exp = math.floor(lg)
+    mant = f"{10 ** (lg - exp):.{sig - 1}f}"
+    if mant.startswith("10"):
+        exp += 1
+        mant = f"{10 ** (lg - exp):.{sig - 1}f}"
+    return f"{sign}{mant.rstrip('0').rstrip('.')}e+{exp}"
+
+
+def int_to_str(n):
+    """Decimal digits of *n* in subquadratic time.
+
+    The int is split by bit position and reassembled with decimal arithmetic,
+    whose multiplication is subquadratic; plain ``str(n)`` is quadratic and
+    refuses inputs over ``sys.get_int_max_str_digits()``.
+    """
+    if n.bit_length() <= 12000:
+        return str(n)
+    D = decimal.Decimal
+    pows = {}
+
+    def pow2(w):
+        r = pows.get(w)
+        if r is None:
+            r = D(2) ** w if w <= 128 else pow2(w >> 1) * pow2(w - (w >> 1))
+            pows[w] = r
+        return r
+
+    def inner(m, w):
+        if w <= 128:
+            return D(m)
+        w2 = w >> 1
+        hi = m >> w2
+        return inner(m - (hi << w2), w2) + inner(hi, w - w2) * pow2(w2)
+
+    with decimal.localcontext() as ctx:
+        ctx.prec = decimal.MAX_PREC
+        ctx.Emax = decimal.MAX_EMAX
+        ctx.Emin = decimal.MIN_EMIN
+        ctx.traps[decimal.Inexact] = True
+        digits = str(inner(abs(n), abs(n).bit_length()))
+    return "-" + digits if n < 0 else digits
+
+
+def full_digits(val):
+    """Complete text of a result; fractions are written ``n/d``."""
+    if isinstance(val, int):
+        return int_to_str(val)
+    if isinstance(val, Fraction):
+        return f"{int_to_str(val.numerator)}/{int_to_str(val.denominator)}"
+    return repr(val)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  FACTORIAL / GAMMA
+# ════════════════════════════════════════════════════════════════════════════
+# x! picks a strategy by input: a precomputed float table up to 170!, exact
+# ints up to EXACT_MAX_FACTORIAL (about a millisecond) in exact mode, Γ(x+1)
+# for non-integers, and lgamma-based Magnitudes beyond the float range.
+
+EXACT_MAX_FACTORIAL = 5000
+
+_FACT_TABLE = tuple(float(math.factorial(n)) for n in range(171))
+
+_LN10 = math.log(10)
+
+
+class Magnitude:
+    """A real number too large for float, kept as its sign and log10."""
+
+    __slots__ = ("sign", "log10")
+
+    def __init__(self, sign, log10):
+        self.sign = sign
+        self.log10 = log10
+
+    def __neg__(self):
+        return Magnitude(-self.sign, self.log10)
+
+    def __repr__(self):
+        return f"Magnitude({self.sign}, {self.log10!r})"
+
+
+def gamma(x):
+    """Real Γ(x); a Magnitude once Γ(x) no longer fits in a float."""
+    x = float(x)
+    if not math.isfinite(x):
+        raise ValueError("math domain error")
+    if x > 171:
+        return Magnitude(1, math.lgamma(x) / _LN10)
+    return math.gamma(x)
+
+
+def factorial(x, exact=False):
+    """x! for any real x ≥ 0 (or non-integer x > -1); see the section note."""
+    x = _norm(x)
+    if isinstance(x, float) and x.is_integer():
+        x = int(x)
+    if not isinstance(x, int):
+        return gamma(float(x) + 1)
+    if x < 0:
+        raise ValueError("factorial of a negative integer")
+    if exact and x <= EXACT_MAX_FACTORIAL:
+        return math.factorial(x)
+    if x < len(_FACT_TABLE):
+        return _FACT_TABLE[x]
+    return Magnitude(1, math.lgamma(x + 1) / _LN10)
+
+
+def _float_result(f):
+    """Wrap *f* for use inside expressions, where Magnitudes cannot go."""
+    def g(x):
+        r = f(x)
+        if isinstance(r, Magnitude):
+            raise OverflowError("Result too large")
+        return r
+    return g
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  SCIENTIFIC KEYPAD
+# ════════════════════════════════════════════════════════════════════════════
+ANGLE_MODES = ("DEG", "RAD", "GRAD")
+
+# Keys that evaluate the current expression before acting on it.
+EVAL_KEYS = frozenset({"=", "MS", "M+", "M−", "±", "%",
+                       "sin", "cos", "tan", "sin⁻¹", "cos⁻¹", "tan⁻¹",
+                       "log", "10ˣ", "ln", "eˣ", "√", "x²", "∛", "x³",
+                       "1/x", "x!"})
+
+INV_MAP = {"sin": "sin⁻¹", "cos": "cos⁻¹", "tan": "tan⁻¹",
+           "log": "10ˣ", "ln": "eˣ", "√": "x²", "x²": "√", "∛": "x³", "xʸ": "ʸ√x"}
+
+
+class LRUCache:
+    """Bounded mapping that drops the least recently used entry when full.
+
+    ``hits``, ``misses`` and ``evictions`` count lookups since creation (or
+    the last ``clear()``) so the size can be tuned against real use.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize   = maxsize
+        self._data     = OrderedDict()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            val = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return val
+
+    def put(self, key, val):
+        data = self._data
+        if key in data:
+            data.move_to_end(key)
+        elif self.maxsize <= 0:
+            return
+        elif len(data) >= self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        data[key] = val
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+class ExprBuffer:
+    """Immutable token zipper holding the keypad expression.
+
+    Tokens are ``(raw, display)`` pairs, the text the engine evaluates and
+    the glyphs shown for it, so the two strings cannot drift apart.  Tokens
+    left of the cursor are a cons list nearest first, tokens right of it a
+    cons list in order.  Inserting, deleting and moving the cursor return a
+    new buffer in O(1) that shares everything else with the old one, so any
+    version can be kept for undo at no copying cost.
+
+    The joined strings are built on first use: from the previous version's
+    strings by one splice when those are at hand, otherwise by walking the
+    lists.  ``forget()`` drops them from versions that are only kept for undo.
+    """
+    __slots__ = ("left", "right", "size", "_joined", "_edit")
+
+    def __init__(self, left=None, right=None, size=0, edit=None):
+        self.left, self.right, self.size = left, right, size
+        self._joined = None     # (raw, raw cursor offset, display, display offset)
+        self._edit   = edit     # (previous buffer, raw, display, kind)
+
+    @classmethod
+    def of(cls, tokens):
+        left, n = None, 0
+        for tok in tokens:
+            left, n = (tok, left), n + 1
+        return cls(left, None, n)
+
+    def __len__(self):
+        return self.size
+
+    def last(self):
+        """Token left of the cursor, or None."""
+        return self.left[0] if self.left is not None else None
+
+    def insert(self, raw, display=None):
+        tok = (raw, raw if display is None else display)
+        return ExprBuffer((tok, self.left), self.right, self.size + 1,
+                          (self, tok[0], tok[1], "ins"))
+
+    def delete(self):
+        """Drop the token left of the cursor."""
+        if self.left is None: return self
+        raw, disp = self.left[0]
+        return ExprBuffer(self.left[1], self.right, self.size - 1,
+                          (self, raw, disp, "del"))
+
+    def move(self, n):
+        """Cursor moved *n* tokens (negative: left), clamped to the ends."""
+        left, right = self.left, self.right
+        dr = dd = 0
+        while n < 0 and left is not None:
+            (r, d), left, right, n = left[0], left[1], (left[0], right), n + 1
+            dr -= len(r); dd -= len(d)
+        while n > 0 and right is not None:
+            (r, d), left, right, n = right[0], (right[0], left), right[1], n - 1
+            dr += len(r); dd += len(d)
+        if left is self.left: return self
+        return ExprBuffer(left, right, self.size, (self, dr, dd, "mov"))
+
+    def forget(self):
+        self._joined = None
+
+    def _join(self):
+        j = self._joined
+        if j is not None: return j
+        prev, r, d, kind = self._edit or (None, 0, 0, None)
+        p = prev._joined if prev is not None else None
+        if p is None:
+            before, node = [], self.left
+            while node is not None:
+                before.append(node[0]); node = node[1]
+            before.reverse()
+            rb, db = "".join(t[0] for t in before), "".join(t[1] for t in before)
+            after, node = [], self.right
+            while node is not None:
+                after.append(node[0]); node = node[1]
+            j = (rb + "".join(t[0] for t in after), len(rb),
+                 db + "".join(t[1] for t in after), len(db))
+        else:
+            raw, rc, disp, dc = p
+            if kind == "ins":
+                j = (raw[:rc] + r + raw[rc:], rc + len(r),
+                     disp[:dc] + d + disp[dc:], dc + len(d))
+            elif kind == "del":
+                j = (raw[:rc - len(r)] + raw[rc:], rc - len(r),
+                     disp[:dc - len(d)] + disp[dc:], dc - len(d))
+            else:
+                j = (raw, rc + r, disp, dc + d)
+        self._joined, self._edit = j, None
+        return j
+
+    @property
+    def raw(self):
+        return (self._joined or self._join())[0]
+
+    @property
+    def display(self):
+        return (self._joined or self._join())[2]
+
+    def display_with_cursor(self, mark="|"):
+        """Display text, with *mark* at the cursor unless it is at the end."""
+        _, _, disp, dc = self._join()
+        return disp if dc == len(disp) else disp[:dc] + mark + disp[dc:]
+
+
+_EMPTY = ExprBuffer()
+# Raw forms of the binary operators a following operator key replaces.
+_RAW_OPS = frozenset({"+", "-", "*", "/", "**", "**(1/"})
+_PASTE_TOKEN = re.compile(r"[A-Za-z_][A-Za-z_0-9]*|\*\*|.", re.S)
+_ANS_NAME = re.compile(r"\bans\b")
+# Keys that only move the cursor or walk the undo history.
+EDIT_KEYS = frozenset({"◀", "▶", "⇤", "⇥", "↶", "↷"})
+
+
+class Keypad:
+    """State machine behind the scientific keypad.
+
+    ``press(key)`` takes the button labels of ScientificPage and updates the
+    display fields ``expr_text``, ``result_text`` and ``mem_text``.  The live
+    preview is not computed inside ``press``; it sets ``preview_due`` and the
+    caller runs ``preview()`` when convenient (the GUI does it on idle).
+
+    The expression lives in ``buf``, an ExprBuffer; ``expr`` and
+    ``display_str`` are its joined raw and display texts.  ``◀ ▶ ⇤ ⇥`` move
+    the cursor, typing inserts at it and ``⌫`` deletes the token before it.
+    Every key that changes the expression leaves an undo point; ``↶`` and
+    ``↷`` step through them.
+    """
+
+    def __init__(self, cache_size=256):
+        self.buf         = _EMPTY
+        self._undo       = None   # cons list of (buf, held) to go back to
+        self._redo       = None
+        self.memory      = 0
+        self.last_result = None
+        self.angle_mode  = "DEG"
+        self.inv_mode    = False
+        self.exact       = False
+        self._held       = 0      # value the name ``ans`` refers to in expr
+
+        self.expr_text   = ""
+        self.result_text = "0"
+        self.mem_text    = ""
+        self.preview_due = False
+        self._live       = IncrementalEvaluator()
+        # (expr, angle_mode, exact) -> (held, value), filled by the preview,
+        # by evaluations and by remember(); see _cache_key().
+        self.cache       = LRUCache(cache_size)
+        self.history     = None   # e.g. calc_history.HistoryTape; gets each "="
+        self.recorder    = None   # e.g. calc_trace.TraceWriter; gets every input
+
+    @property
+    def expr(self):
+        return self.buf.raw
+
+    @expr.setter
+    def expr(self, text):
+        self._set(text, text)
+
+    @property
+    def display_str(self):
+        return self.buf.display
+
+    def toggle_angle(self):
+        i = ANGLE_MODES.index(self.angle_mode)
+        self.angle_mode = ANGLE_MODES[(i + 1) % len(ANGLE_MODES)]
+        self._record("@angle")
+
+    def toggle_inv(self):
+        self.inv_mode = not self.inv_mode
+        self._record("@inv")
+
+    def toggle_exact(self):
+        self.exact = not self.exact
+        self.preview_due = True
+        self._record("@exact")
+
+    def _record(self, event, *args):
+        if self.recorder is not None:
+            try:
+                self.recorder.record(event, *args)
+            except OSError:
+                self.recorder = None        # disk trouble: stop recording
+
+    def full_result_text(self):
+        """All digits of the last exact result, or None for float results."""
+        if isinstance(self.last_result, (int, Fraction)):
+            return full_digits(self.last_result)
+        return None
+
+    def result_is_summary(self):
+        """True when the display shows an abbreviation of an exact result."""
+        val = self.last_result
+        if isinstance(val, int):
+            return abs(val) >= 10**15
+        if isinstance(val, Fraction):
+            return abs(val.numerator) >= 10**15 or val.denominator >= 10**15
+        return False
+
+    @instrument()
+    def press(self, key):
+        if key in ("↶", "↷"):
+            self._step_history(key == "↶")
+        else:
+            state = (self.buf, self._held)
+            try:
+                self._handle(key)
+            except Exception as ex:
+                self._show_error(str(ex))
+            if key not in EDIT_KEYS:
+                self._checkpoint(state)
+        if self.recorder is not None: self._record(key)
+
+    def _checkpoint(self, state):
+        """Make *state* an undo point if the expression has changed since."""
+        if self.buf is not state[0]:
+            self.buf.display                    # splice from the old strings
+            state[0].forget()                   # before they are dropped
+            self._undo = (state, self._undo)
+            self._redo = None
+
+    def _step_history(self, back):
+        stack = self._undo if back else self._redo
+        if stack is None: return
+        (buf, held), rest = stack
+        other = ((self.buf, self._held), self._redo if back else self._undo)
+        if back: self._undo, self._redo = rest, other
+        else:    self._redo, self._undo = rest, other
+        self.buf, self._held = buf, held
+        self._show(); self.preview_due = True
+
+    def undo(self):
+        self.press("↶")
+
+    def redo(self):
+        self.press("↷")
+
+    def press_many(self, keys):
+        """Apply a key sequence (macro replay); the preview is left pending."""
+        for key in keys:
+            self.press(key)
+
+    def feed(self, text):
+        """Insert pasted text at the cursor as one undo step.
+
+        The text is taken literally (the expression engine understands the
+        display glyphs × ÷ − ^ π √) and split into names, ``**`` and single
+        characters, so it edits like typed input; the preview runs once
+        afterwards.  Each ``=`` in the text evaluates what precedes it.
+        """
+        recorder, self.recorder = self.recorder, None   # one event, not each "="
+        try:
+            for i, part in enumerate("".join(text.split()).split("=")):
+                if i:
+                    self.press("=")
+                if part:
+                    state = (self.buf, self._held)
+                    buf = self.buf
+                    for tok in _PASTE_TOKEN.findall(part):
+                        buf = buf.insert(tok)
+                    self.buf = buf
+                    self._show(); self.preview_due = True
+                    self._checkpoint(state)
+        finally:
+            self.recorder = recorder
+        self._record("@feed", text)
+
+    def recall(self, entry):
+        """Put a history entry's expression back on the display.
+
+        Entries whose expression uses ``ans`` are refused: it named a huge
+        value held at the time, which the tape does not keep.
+        """
+        state = (self.buf, self._held)
+        if _ANS_NAME.search(entry.expr):
+            self._show_error("Entry uses a result no longer held")
+        else:
+            self._set(entry.expr, entry.display)
+            self.preview_due = True
+        self._checkpoint(state)
+        self._record("@recall", entry.expr, entry.display)
+
+    def _set(self, raw, display):
+        """Replace the expression.  Text that reads the same raw and displayed
+        becomes one token per character (names and ``**`` whole), so ``⌫``
+        edits it; otherwise it is a single token."""
+        if raw == display:
+            self.buf = ExprBuffer.of((t, t) for t in _PASTE_TOKEN.findall(raw))
+        else:
+            self.buf = ExprBuffer.of([(raw, display)] if raw else [])
+        self._show()
+
+    def _show(self):
+        self.expr_text = self.buf.display_with_cursor()
+
+    def eval_request(self):
+        """``(expr, angle_mode, exact, ans)`` describing the current evaluation."""
+        return (self.expr, self.angle_mode, self.exact, self._held)
+
+    def needs_value(self):
+        """True when evaluating the current expression has not been done yet."""
+        return bool(self.expr.strip()) and self._cached(self.eval_request()) is None
+
+    def remember(self, request, val):
+        """Record the value of an ``eval_request()`` computed out of process."""
+        self.cache.put(self._cache_key(request), (request[3], val))
+        if request[:3] == self.eval_request()[:3]:
+            self.result_text = fmt(val)
+
+    @staticmethod
+    def _cache_key(request):
+        # The angle mode is part of the key, so toggling it never serves a
+        # value computed under another mode.
+        expr, mode, exact, _ = request
+        return ("".join(expr.split()), mode, exact)
+
+    def _cached(self, request):
+        """Cached value for *request*, or None.
+
+        An entry only counts if it was computed against the same held ``ans``
+        value, which is compared by identity.
+        """
+        held, val = self.cache.get(self._cache_key(request), (None, None))
+        return val if held is request[3] else None
+
+    def fail(self, msg):
+        state = (self.buf, self._held)
+        self._show_error(msg)
+        self._checkpoint(state)
+        self._record("@fail", msg)
+
+    def preview(self):
+        self.preview_due = False
+        expr = self.expr
+        if not expr.strip(): return
+        try:
+            val = self._live.evaluate(expr, self.angle_mode,
+                                      self.exact, self._held)
+            self.cache.put(self._cache_key(self.eval_request()), (self._held, val))
+            self.result_text = fmt(val if self.exact else float(val))
+        except Exception:
+            pass
+
+    @instrument()
+    def _handle(self, key):
+
+        if key == "MC":
+            self.memory = 0; self.mem_text = ""; return
+        if key == "MR":
+            mem = self.memory
+            raw = repr(mem) if isinstance(mem, float) else self._literal(mem)
+            self._append(raw, fmt(mem) if raw == "ans" else raw); return
+        if key in ("M+","M−","MS"):
+            val = self._eval_safe()
+            if val is None: return
+            if   key == "MS": self.memory = val
+            elif key == "M+": self.memory += val
+            else:             self.memory -= val
+            self.mem_text = f"M={fmt(self.memory)}"; return
+
+
+        if key == "C":
+            self.buf = _EMPTY
+            self.expr_text = ""; self.result_text = "0"; return
+        if key == "⌫":
+            self.buf = self.buf.delete()
+            self._show(); self.preview_due = True; return
+        if key in ("◀", "▶"):
+            self.buf = self.buf.move(-1 if key == "◀" else 1)
+            self._show(); return
+        if key in ("⇤", "⇥"):
+            self.buf = self.buf.move(-len(self.buf) if key == "⇤" else len(self.buf))
+            self._show(); return
+
+
+        if key == "=":
+            val = self._eval_safe()
+            if val is not None:
+                if self.history is not None:
+                    try:
+                        self.history.append(self.expr, self.display_str, fmt(val))
+                    except OSError:
+                        self.history = None     # disk trouble: stop recording
+                self.result_text = fmt(val)
+                self.last_result = val
+                self._set(self._literal(val), fmt(val))
+                self.expr_text = ""
+            return
+
+
+        if key == "π":  self._append(str(math.pi), "π"); return
+        if key == "e":  self._append(str(math.e),  "e"); return
+        if key == "Ans":
+            if self.last_result is not None:
+                ans = self.last_result
+                literal = self.exact or isinstance(ans, Magnitude)
+                self._append(self._literal(ans) if literal else str(ans), "Ans")
+            return
+
+
+        mode = self.angle_mode
+        unary = {
+            "sin":   lambda x: math.sin(to_rad(x, mode)),
+            "cos":   lambda x: math.cos(to_rad(x, mode)),
+            "tan":   lambda x: math.tan(to_rad(x, mode)),
+            "sin⁻¹": lambda x: from_rad(math.asin(x), mode),
+            "cos⁻¹": lambda x: from_rad(math.acos(x), mode),
+            "tan⁻¹": lambda x: from_rad(math.atan(x), mode),
+            "log":   math.log10,   "10ˣ": lambda x: 10**x,
+            "ln":    math.log,     "eˣ":  math.exp,
+            "√":     math.sqrt,    "x²":  lambda x: x**2,
+            "∛":     lambda x: x**(1/3), "x³": lambda x: x**3,
+            "1/x":   lambda x: 1/x,
+            "x!":    lambda x: factorial(x, self.exact),
+        }
+        if self.exact:
+            unary.update({
+                "10ˣ": lambda x: _exact_pow(10, x),
+                "x²":  lambda x: _exact_pow(x, 2),
+                "x³":  lambda x: _exact_pow(x, 3),
+                "√":   _exact_sqrt,
+                "1/x": lambda x: _exact_div(1, x),
+            })
+        if key in unary:
+            val = self._eval_safe()
+            if val is None: return
+            result = unary[key](val)
+            self.result_text = fmt(result)
+            self.last_result = result
+            self._set(self._literal(result), fmt(result))
+            self.expr_text = f"{key}({fmt(val)})"
+            return
+
+        if key == "xʸ":  self._append("**", "^");     return
+        if key == "ʸ√x": self._append("**(1/", "^(1/"); return
+        if key == "EXP":  self._append("*10**", "E");  return
+
+        if key == "±":
+            val = self._eval_safe()
+            if val is not None:
+                neg = -val
+                self._set(self._literal(neg), fmt(neg)); self.result_text = fmt(neg)
+            return
+
+        if key == "%":
+            val = self._eval_safe()
+            if val is not None:
+                pct = _exact_div(val, 100) if self.exact else val / 100
+                self._set(self._literal(pct), fmt(pct)); self.result_text = fmt(pct)
+            return
+
+
+        op_map = {"×": "*", "÷": "/", "−": "-"}
+        raw = op_map.get(key, key)
+        if raw in ("+", "-", "*", "/"):
+            last = self.buf.last()
+            if last is not None and last[0] in _RAW_OPS:
+                self.buf = self.buf.delete()        # a new operator replaces it
+
+        self._append(raw, key)
+
+    def _append(self, raw, display=None):
+        self.buf = self.buf.insert(raw, display)
+        self._show()
+        self.preview_due = True
+
+    @instrument()
+    def _eval_safe(self, silent=False):
+        try:
+            req = self.eval_request()
+            if not req[0].strip(): return None
+            if isinstance(req[3], Magnitude) and _ANS_NAME.search(req[0]):
+                raise OverflowError     # shown, but too large to compute with
+            val = self._cached(req)
+            if val is None:
+                val = evaluate(req[0], self.angle_mode,
+                               exact=self.exact, ans=self._held)
+                self.cache.put(self._cache_key(req), (self._held, val))
+            if self.exact: return val
+            val = float(val)
+            if not math.isfinite(val):
+                raise OverflowError if math.isinf(val) else ValueError
+            return val
+        except OverflowError:
+            if not silent: self._show_error("Result too large")
+            return None
+        except:
+            if not silent: self._show_error("Syntax Error")
+            return None
+
+    @staticmethod
+    def _exact_text(val):
+        if isinstance(val, Fraction):
+            return f"({int_to_str(val.numerator)}/{int_to_str(val.denominator)})"
+        return int_to_str(val) if isinstance(val, int) else repr(val)
+
+    def _literal(self, val):
+        """Text standing for *val* in ``self.expr``.
+
+        Float mode keeps the formatted value as before.  In exact mode small
+        values are spelled out exactly; huge ones are never converted to
+        digits but held and referenced through the name ``ans``.  So is a
+        Magnitude in either mode; evaluating with it gives "Result too large".
+        """
+        if isinstance(val, Magnitude):
+            self._held = val
+            return "ans"
+        if not self.exact:
+            return fmt(val)
+        if isinstance(val, float):
+            return repr(val)
+        if isinstance(val, Fraction):
+            size = max(val.numerator.bit_length(), val.denominator.bit_length())
+        else:
+            size = val.bit_length()
+        if size <= 3000:
+            return self._exact_text(val)
+        self._held = val
+        return "ans"
+
+    def _show_error(self, msg):
+        self.result_text = "Error"
+        self.buf = _EMPTY
+        self.expr_text = msg
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  PLOTTING
+# ════════════════════════════════════════════════════════════════════════════
+# y = f(x) is sampled in tiles: at zoom level L a tile covers [i*2**L,
+# (i+1)*2**L) with TILE_COLUMNS columns, each reduced to the min and max of
+# its samples.  A view picks the level whose columns are at most one pixel
+# wide, so panning only samples tiles that scroll into view and zooming back
+# reuses cached ones.  Evaluation is one NumPy pass per tile when NumPy is
+# installed and a plain loop otherwise.
+TILE_COLUMNS    = 256
+TILE_OVERSAMPLE = 256           # samples per column with NumPy (2 without)
+
+_LANCZOS = (0.99999999999980993, 676.5203681218851, -1259.1392167224028,
+            771.32342877765313, -176.61502916214059, 12.507343278686905,
+            -0.13857109526572012, 9.9843695780195716e-6, 1.5056327351493116e-7)
+
+
+def _np_gamma(np, x):
+    """Γ over an array (Lanczos, g=7, with reflection); NaN at the poles."""
+    x = np.asarray(x, dtype=np.float64)
+    refl = x < 0.5
+    z = np.where(refl, 1 - x, x) - 1
+    s = _LANCZOS[0] + sum(c / (z + i) for i, c in enumerate(_LANCZOS[1:], 1))
+    t = z + 7.5
+    g = math.sqrt(2 * math.pi) * t ** (z + 0.5) * np.exp(-t) * s
+    g = np.where(refl, math.pi / (np.sin(math.pi * x) * g), g)
+    return np.where((x <= 0) & (x == np.floor(x)), np.nan, g)
+
+
+@lru_cache(maxsize=None)
+def _numpy_funcs(angle_mode):
+    np = _numpy()
+    k = {"DEG": math.pi / 180, "GRAD": math.pi / 200}.get(angle_mode)
+    def fwd(f): return f if k is None else (lambda x: f(x * k))
+    def inv(f): return f if k is None else (lambda x: f(x) / k)
+    return {"sin": fwd(np.sin), "cos": fwd(np.cos), "tan": fwd(np.tan),
+            "asin": inv(np.arcsin), "acos": inv(np.arccos), "atan": inv(np.arctan),
+            "log": np.log10, "ln": np.log, "sqrt": np.sqrt, "cbrt": np.cbrt,
+            "exp": np.exp, "abs": np.abs,
+            "gamma": lambda x: _np_gamma(np, x),
+            "fact": lambda x: _np_gamma(np, np.add(x, 1.0))}
+
+
+def _undefined(x, a):
+    raise ValueError("undefined")
+
+
+@lru_cache(maxsize=64)
+def compile_vector(text, angle_mode="DEG"):
+    """Compile *text* into ``f(xs, ans=0)`` returning the value for every x
+    (and ``ans``, which may be an array too).  Where the value is undefined
+    or infinite (``1/0``, ``ln(0)``) it is NaN, with or without NumPy.  With
+    NumPy the arrays are evaluated in one pass."""
+    np = _numpy()
+    if np is None:
+        try:
+            f = compile_expr(text, angle_mode)
+        except (ArithmeticError, ValueError):
+            f = _undefined                  # a constant that folds to an error
+
+        def loop(xs, ans=0):
+            out = array("d")
+            ans = ans if hasattr(ans, "__len__") else [ans] * len(xs)
+            for x, a in zip(xs, ans):
+                try:
+                    y = f(x, a)
+                    out.append(y if isinstance(y, float) and math.isfinite(y) else math.nan)
+                except (ArithmeticError, ValueError):
+                    out.append(math.nan)
+            return out
+        return loop
+    ast, _ = parse(text)
+    ops = {"+": np.add, "-": np.subtract, "*": np.multiply,
+           "/": np.true_divide, "**": np.power}
+    fn = _build(ast, float, ops, _numpy_funcs(angle_mode))
+
+    def vec(xs, ans=0):
+        xs = np.asarray(xs, dtype=np.float64)
+        ans = np.asarray(ans, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            y = np.asarray(fn(xs, ans), dtype=np.float64)
+            if not np.isfinite(y).all():
+                y = np.where(np.isfinite(y), y, np.nan)
+        shape = np.broadcast_shapes(xs.shape, ans.shape)
+        return np.broadcast_to(y, shape) if y.shape != shape else y
+    return vec
+
+
+def minmax_columns(ys, columns):
+    """``(mins, maxs)`` of *ys* split into *columns* equal runs, ignoring NaN."""
+    np = _numpy()
+    if np is not None:
+        y = np.asarray(ys, dtype=np.float64).reshape(columns, -1)
+        return np.fmin.reduce(y, axis=1), np.fmax.reduce(y, axis=1)
+    k = len(ys) // columns
+    lo, hi = array("d"), array("d")
+    for i in range(0, k * columns, k):
+        run = [v for v in ys[i:i + k] if v == v]
+        lo.append(min(run) if run else math.nan)
+        hi.append(max(run) if run else math.nan)
+    return lo, hi
+
+
+class PlotSampler:
+    """Min/max envelope of ``y = f(x)`` per screen column, from cached tiles."""
+
+    def __init__(self, text, angle_mode="DEG", oversample=None, cache_size=256):
+        self.f = compile_vector(text, angle_mode)
+        self.oversample = oversample or (TILE_OVERSAMPLE if _numpy() else 2)
+        self.tiles = LRUCache(cache_size)
+
+    def tile(self, level, index):
+        """``(mins, maxs)`` for tile *index* at zoom *level*."""
+        key = (level, index)
+        t = self.tiles.get(key)
+        if t is None:
+            w = 2.0 ** level
+            n = TILE_COLUMNS * self.oversample
+            step, x0 = w / n, index * w
+            np = _numpy()
+            if np is not None:
+                xs = x0 + (np.arange(n) + 0.5) * step
+            else:
+                xs = [x0 + (i + 0.5) * step for i in range(n)]
+            t = minmax_columns(self.f(xs), TILE_COLUMNS)
+            self.tiles.put(key, t)
+        return t
+
+    def columns(self, x0, x1, width):
+        """``(xs, mins, maxs)`` lists for columns covering [x0, x1].
+
+        Columns are between half a pixel and one pixel wide for a view
+        *width* pixels across.
+        """
+        level = math.floor(math.log2(TILE_COLUMNS * (x1 - x0) / max(width, 1)))
+        w = 2.0 ** level
+        cw = w / TILE_COLUMNS
+        xs, lo, hi = [], [], []
+        for i in range(math.floor(x0 / w), math.floor(x1 / w) + 1):
+            mins, maxs = self.tile(level, i)
+            c0 = max(0, math.floor((x0 - i * w) / cw))
+            c1 = min(TILE_COLUMNS, math.ceil((x1 - i * w) / cw))
+            xs.extend((i * TILE_COLUMNS + c + 0.5) * cw for c in range(c0, c1))
+            lo.extend(mins[c0:c1].tolist())
+            hi.extend(maxs[c0:c1].tolist())
+        return xs, lo, hi
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  SOLVER
+# ════════════════════════════════════════════════════════════════════════════
+# Roots, extrema and definite integrals of y = f(x) on [a, b].  The
+# expression is compiled once; multi-start searches scan a grid with one
+# compile_vector call and then refine every bracket together, one vector
+# call per iteration, so the cost per step does not grow with the number of
+# roots.  A single bracket (find_root) uses Brent's method on the scalar
+# callable.  Integrals use adaptive Gauss-Kronrod (7/15) and evaluate all
+# open subintervals of a round in one call.
+SOLVER_SAMPLES = 2000           # grid points scanned for sign changes / turns
+_EPS = 2.220446049250313e-16
+
+
+def _scalar(text, angle_mode):
+    f = compile_expr(text, angle_mode)
+
+    def g(x):
+        try:
+            y = f(x)
+        except (ArithmeticError, ValueError):
+            return math.nan
+        return float(y) if isinstance(y, (int, float)) else math.nan
+    return g
+
+
+def _values(f, xs):
+    ys = f(xs)
+    return ys.tolist() if hasattr(ys, "tolist") else list(ys)
+
+
+def _grid(a, b, n):
+    step = (b - a) / n
+    return [a + i * step for i in range(n)] + [b]
+
+
+def _check_interval(a, b):
+    if not (math.isfinite(a) and math.isfinite(b)):
+        raise ValueError("interval bounds must be finite")
+    if a >= b:
+        raise ValueError("need a < b")
+
+
+def find_root(text, a, b, angle_mode="DEG", tol=1e-12, maxiter=200):
+    """Root of *text* in [a, b] by Brent's method; f(a) and f(b) must
+    differ in sign."""
+    _check_interval(a, b)
+    f = _scalar(text, angle_mode)
+    fa, fb = f(a), f(b)
+    if fa != fa or fb != fb:
+        raise ValueError("function is undefined at an end of the bracket")
+    if fa == 0: return a
+    if fb == 0: return b
+    if (fa > 0) == (fb > 0):
+        raise ValueError("f(a) and f(b) have the same sign")
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(maxiter):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2 * _EPS * abs(b) + 0.5 * tol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol1 or fb == 0:
+            return b
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa                     # secant or inverse quadratic step
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0: q = -q
+            else:     p = -p
+            if 2 * p < min(3 * m * q - abs(tol1 * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m                       # bisection
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else math.copysign(tol1, m)
+        fb = f(b)
+        if fb != fb:
+            raise ValueError("function is undefined inside the bracket")
+    return b
+
+
+def find_roots(text, a, b, angle_mode="DEG", samples=SOLVER_SAMPLES, tol=1e-12,
+               maxiter=200):
+    """All roots of *text* in [a, b] found as sign changes on a grid of
+    *samples* intervals (plus exact zeros on it), sorted.  Poles where the
+    sign flips are rejected."""
+    _check_interval(a, b)
+    f = compile_vector(text, angle_mode)
+    xs = _grid(a, b, samples)
+    ys = _values(f, xs)
+    roots = [x for x, y in zip(xs, ys) if y == 0]
+    L, H, FL, FH = [], [], [], []
+    for i in range(samples):
+        y0, y1 = ys[i], ys[i + 1]
+        if y0 * y1 < 0:
+            L.append(xs[i]); H.append(xs[i + 1]); FL.append(y0); FH.append(y1)
+    scale = [min(abs(u), abs(v)) for u, v in zip(FL, FH)]
+    # Illinois regula falsi on every bracket at once; a bracket that did not
+    # halve in the last step is bisected next, so each one at least halves
+    # every two steps.
+    side = [0] * len(L)
+    bisect = [False] * len(L)
+    for _ in range(maxiter):
+        live = [i for i in range(len(L)) if H[i] - L[i] > tol * (1 + abs(L[i]))]
+        if not live: break
+        xm = []
+        for i in live:
+            x = 0.5 * (L[i] + H[i])
+            if not bisect[i]:
+                x2 = (L[i] * FH[i] - H[i] * FL[i]) / (FH[i] - FL[i])
+                if L[i] < x2 < H[i]: x = x2
+            xm.append(x)
+        for i, x, y in zip(live, xm, _values(f, xm)):
+            w = H[i] - L[i]
+            if y == 0 or y != y:
+                L[i] = H[i] = x; FL[i] = FH[i] = y; continue
+            if (y < 0) == (FL[i] < 0):
+                L[i], FL[i] = x, y
+                if side[i] == -1: FH[i] *= 0.5
+                side[i] = -1
+            else:
+                H[i], FH[i] = x, y
+                if side[i] == 1: FL[i] *= 0.5
+                side[i] = 1
+            bisect[i] = H[i] - L[i] > 0.5 * w
+    for l, h, fl, fh, s in zip(L, H, FL, FH, scale):
+        x, r = (l, fl) if abs(fl) <= abs(fh) else (h, fh)
+        if r == r and abs(r) <= s:          # |f| shrank: a root, not a pole
+            roots.append(x)
+    roots.sort()
+    return [r for i, r in enumerate(roots)
+            if i == 0 or r - roots[i - 1] > 4 * tol * (1 + abs(r))]
+
+
+_INVPHI = (math.sqrt(5) - 1) / 2
+
+
+def find_extrema(text, a, b, angle_mode="DEG", samples=SOLVER_SAMPLES, maxiter=100):
+    """Local extrema of *text* inside (a, b) as sorted ``(x, y, kind)``
+    tuples, *kind* being ``"min"`` or ``"max"``.  Turns on the sample grid
+    are refined together by golden-section search (x to about 1e-8)."""
+    _check_interval(a, b)
+    f = compile_vector(text, angle_mode)
+    xs = _grid(a, b, samples)
+    ys = _values(f, xs)
+    # Turns of g = sign*f towards a minimum, with g at the three samples.
+    cand = []
+    for i in range(1, samples):
+        y0, y1, y2 = ys[i - 1], ys[i], ys[i + 1]
+        if y0 != y0 or y1 != y1 or y2 != y2: continue
+        if y1 < y0 and y1 <= y2:   s = 1.0
+        elif y1 > y0 and y1 >= y2: s = -1.0
+        else: continue
+        cand.append((xs[i - 1], xs[i + 1], s, s * y0, s * y1, s * y2))
+    if not cand: return []
+    # A jump across a pole looks like a turn too.  At a real turn g stays
+    # below the outer samples halfway in on either side, and the refined
+    # minimum is not far below the middle sample.
+    mids = [v for l, h, *_ in cand for v in (0.75 * l + 0.25 * h, 0.25 * l + 0.75 * h)]
+    gm = _values(f, mids)
+    cand = [t for k, t in enumerate(cand)
+            if t[2] * gm[2 * k] <= t[3] and t[2] * gm[2 * k + 1] <= t[5]]
+    n = len(cand)
+    lo = [t[0] for t in cand]
+    hi = [t[1] for t in cand]
+    sign = [t[2] for t in cand]
+    c = [h - _INVPHI * (h - l) for l, h in zip(lo, hi)]
+    d = [l + _INVPHI * (h - l) for l, h in zip(lo, hi)]
+    fc = [s * y for s, y in zip(sign, _values(f, c))] if n else []
+    fd = [s * y for s, y in zip(sign, _values(f, d))] if n else []
+    for _ in range(maxiter):
+        live = [i for i in range(n)
+                if hi[i] - lo[i] > 1e-8 * (1 + abs(lo[i]))]
+        if not live: break
+        new = []
+        for i in live:
+            if fc[i] < fd[i]:               # minimum in [lo, d]
+                hi[i], d[i], fd[i] = d[i], c[i], fc[i]
+                c[i] = hi[i] - _INVPHI * (hi[i] - lo[i])
+                new.append(c[i])
+            else:                           # minimum in [c, hi]
+                lo[i], c[i], fc[i] = c[i], d[i], fd[i]
+                d[i] = lo[i] + _INVPHI * (hi[i] - lo[i])
+                new.append(d[i])
+        for i, x, y in zip(live, new, _values(f, new)):
+            y *= sign[i]
+            if x == c[i]: fc[i] = y
+            else:         fd[i] = y
+    out = []
+    for i in range(n):
+        x, g = (c[i], fc[i]) if fc[i] < fd[i] else (d[i], fd[i])
+        _, _, _, g0, g1, g2 = cand[i]
+        if g == g and g >= g1 - 4 * (min(g0, g2) - g1) - 1e-12 * (1 + abs(g1)):
+            out.append((x, sign[i] * g, "min" if sign[i] > 0 else "max"))
+    return out
+
+
+# 15-point Kronrod nodes on [0, 1]; every other one is a 7-point Gauss node.
+_GK_X = (0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+         0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+         0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+         0.207784955007898467600689403773245, 0.0)
+_GK_WK = (0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+          0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+          0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+          0.204432940075298892414161999234649, 0.209482141084727828012999174891714)
+_GK_WG = (0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+          0.381830050505118944950369775488975, 0.417959183673469387755102040816327)
+
+
+def integrate(text, a, b, angle_mode="DEG", tol=1e-10, max_intervals=4096):
+    """``(value, error_estimate)`` of the integral of *text* over [a, b].
+
+    Subintervals are bisected until each one's Gauss/Kronrod difference is
+    within its share of ``tol * max(1, |value|)``.  Raises ValueError where
+    the integrand is undefined at a node.
+    """
+    if a == b: return 0.0, 0.0
+    if a > b:
+        v, err = integrate(text, b, a, angle_mode, tol, max_intervals)
+        return -v, err
+    _check_interval(a, b)
+    f = compile_vector(text, angle_mode)
+    total = err_total = 0.0
+    scale = None
+    active = [(a, b)]
+    while active:
+        xs = []
+        for l, r in active:
+            c, h = 0.5 * (l + r), 0.5 * (r - l)
+            xs.extend(c - h * t for t in _GK_X[:7])
+            xs.extend(c + h * t for t in _GK_X[:7])
+            xs.append(c)
+        ys = _values(f, xs)
+        if any(y != y or y in (math.inf, -math.inf) for y in ys):
+            raise ValueError("integrand is undefined on the interval")
+        parts = []
+        for k, (l, r) in enumerate(active):
+            y = ys[15 * k:15 * k + 15]
+            h = 0.5 * (r - l)
+            pair = [y[j] + y[7 + j] for j in range(7)]
+            kron = h * (sum(w * p for w, p in zip(_GK_WK, pair)) + _GK_WK[7] * y[14])
+            gauss = h * (_GK_WG[0] * pair[1] + _GK_WG[1] * pair[3] +
+                         _GK_WG[2] * pair[5] + _GK_WG[3] * y[14])
+            parts.append((l, r, kron, abs(kron - gauss)))
+        if scale is None:
+            scale = tol * max(1.0, abs(parts[0][2]))
+        nxt = []
+        for l, r, kron, err in parts:
+            share = scale * (r - l) / (b - a)
+            if (err <= share or len(nxt) + len(active) >= max_intervals
+                    or r - l <= 64 * _EPS * (b - a)):   # e.g. at a singularity
+                total += kron; err_total += err
+            else:
+                m = 0.5 * (l + r)
+                nxt += [(l, m), (m, r)]
+        active = nxt
+    return total, err_total
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  CONVERSIONS
+# ════════════════════════════════════════════════════════════════════════════
+# Every unit is declared once as (scale, offset, dimension): a value v in the
+# unit is v*scale + offset in SI base units, and the dimension is a tuple of
+# exponents over _DIMENSIONS.  Compound units such as km/h, L/100km or MB/s
+# are parsed from the declared ones, so they need no table entry.  Scales and
+# offsets are kept as exact fractions; only a resolved conversion is rounded
+# to float, so chains like F -> K -> C do not accumulate error.
+_DIMENSIONS = ("length", "mass", "time", "temperature", "information")
+
+Unit = namedtuple("Unit", "scale offset dim")
+Conversion = namedtuple("Conversion", "scale offset inverse")
+
+_UNITS = {}
+
+
+def _base_unit(name, dimension):
+    _UNITS[name] = Unit(Fraction(1), Fraction(0),
+                        tuple(int(d == dimension) for d in _DIMENSIONS))
+
+
+def define_unit(name, definition, offset=0, *aliases):
+    """Declare *name* as *definition*, e.g. ``define_unit("mile", "1609.344 m")``.
+
+    *offset* (in SI units; a Fraction, int or str) makes an affine unit such
+    as Celsius.
+    """
+    u = parse_unit(definition)
+    u = Unit(u.scale, u.offset + Fraction(offset), u.dim)
+    for n in (name,) + aliases:
+        _UNITS[n] = u
+    parse_unit.cache_clear()
+    _CONVERSIONS.clear()
+    return u
+
+
+_UNIT_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|([*/·])"
+                         r"|\^(-?\d+)|([²³])|([^\s\d*/·^²³]+))")
+_SUPERSCRIPTS = {"²": 2, "³": 3}
+
+
+@lru_cache(maxsize=None)
+def parse_unit(text):
+    """Unit for a declared name or a product/quotient of declared units.
+
+    ``km/h``, ``L/100km``, ``kg·m/s²``, ``m^3`` and ``1000 m`` are accepted.
+    Affine units (Celsius) cannot take part in compounds.
+    """
+    u = _UNITS.get(text)
+    if u is not None:
+        return u
+    zero = (0,) * len(_DIMENSIONS)
+    one = Fraction(1)
+    scale, dim = one, zero
+    term = [one, None, 1]                   # number, unit, exponent
+    sign = 1
+
+    def flush():
+        nonlocal scale, dim
+        num, unit, exp = term
+        if unit is None:
+            unit = Unit(one, Fraction(0), zero)
+        elif unit.offset:
+            raise ValueError(f"affine unit in compound {text!r}")
+        scale *= (num * unit.scale ** exp) ** sign
+        dim = tuple(d + sign * exp * e for d, e in zip(dim, unit.dim))
+
+    pos, text = 0, text.strip()
+    if not text:
+        raise ValueError("empty unit")
+    while pos < len(text):
+        m = _UNIT_TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"cannot parse unit {text!r}")
+        pos = m.end()
+        num, op, pw, sup, name = m.groups()
+        if num:
+            term[0] *= Fraction(num)
+        elif op:
+            flush()
+            term[:] = [one, None, 1]
+            sign = -1 if op == "/" else 1
+        elif pw or sup:
+            if term[1] is None:
+                raise ValueError(f"exponent without unit in {text!r}")
+            term[2] *= int(pw) if pw else _SUPERSCRIPTS[sup]
+        else:
+            if term[1] is not None:
+                raise ValueError(f"missing operator in {text!r}")
+            term[1] = _UNITS.get(name)
+            if term[1] is None:
+                raise ValueError(f"unknown unit {name!r}")
+    flush()
+    return Unit(scale, Fraction(0), dim)
+
+
+_CONVERSIONS = {}
+
+
+def conversion(frm, to):
+    """Fused ``Conversion(scale, offset, inverse)`` taking *frm* values to *to*.
+
+    ``y = x*scale + offset``, or ``y = scale / x`` when *inverse* (reciprocal
+    dimensions, e.g. L/100km to km/L).  Results are cached per (frm, to).
+    """
+    key = (frm, to)
+    c = _CONVERSIONS.get(key)
+    if c is not None:
+        return c
+    a, b = parse_unit(frm), parse_unit(to)
+    if a.dim == b.dim:
+        c = Conversion(float(a.scale / b.scale),
+                       float((a.offset - b.offset) / b.scale), False)
+    elif a.dim == tuple(-d for d in b.dim) and not (a.offset or b.offset):
+        c = Conversion(float(1 / (a.scale * b.scale)), 0.0, True)
+    else:
+        raise ValueError(f"cannot convert {frm} to {to}: dimensions differ")
+    _CONVERSIONS[key] = c
+    return c
+
+
+def convert(value, frm, to):
+    """Convert *value* between any two compatible units."""
+    c = _CONVERSIONS.get((frm, to)) or conversion(frm, to)
+    return c.scale / value if c.inverse else value * c.scale + c.offset
+
+
+for _n, _d in (("m", "length"), ("kg", "mass"), ("s", "time"),
+               ("K", "temperature"), ("bit", "information")):
+    _base_unit(_n, _d)
+
+for _args in (
+    ("km", "1000 m"), ("cm", "0.01 m"), ("mm", "0.001 m"),
+    ("mile", "1609.344 m", 0, "mi"), ("yard", "0.9144 m", 0, "yd"),
+    ("foot", "0.3048 m", 0, "ft"), ("inch", "0.0254 m", 0, "in"),
+    ("nm", "1852 m", 0, "nmi"),                     # nautical mile
+    ("g", "0.001 kg"), ("mg", "0.001 g"), ("ton", "1000 kg"),
+    ("lb", "0.45359237 kg"), ("oz", "lb/16"), ("stone", "14 lb"),
+    ("second", "s"), ("millisecond", "0.001 s", 0, "ms"),
+    ("minute", "60 s", 0, "min"), ("hour", "60 min", 0, "h"),
+    ("day", "24 h"), ("week", "7 day"), ("year", "365.25 day"),
+    ("month", "year/12"),
+    ("hectare", "10000 m²", 0, "ha"), ("acre", "4046.8564224 m²"),
+    ("L", "0.001 m³"), ("mL", "0.001 L"),
+    ("gallon", "3.785411784 L"), ("quart", "gallon/4"), ("pint", "gallon/8"),
+    ("cup", "gallon/16"), ("fl oz", "gallon/128"),
+    ("byte", "8 bit", 0, "B"), ("KB", "1000 byte"), ("MB", "1000 KB"),
+    ("GB", "1000 MB"), ("TB", "1000 GB"), ("PB", "1000 TB"),
+    ("kbit", "1000 bit"), ("Mbit", "1000 kbit"), ("Gbit", "1000 Mbit"),
+    ("mph", "mile/h"), ("knots", "nm/h", 0, "kn"),
+    ("mpg", "mile/gallon"),
+    ("Kelvin", "K"), ("Celsius", "K", Fraction("273.15"), "°C"),
+    ("Fahrenheit", "K/1.8", Fraction("273.15") - 32 / Fraction("1.8"), "°F"),
+):
+    define_unit(*_args)
+
+# Units offered by each converter page, in display order.
+UNITS = {
+    "speed":  ("m/s", "km/h", "mph", "knots", "ft/s"),
+    "length": ("m", "km", "cm", "mm", "mile", "yard", "foot", "inch", "nm"),
+    "mass":   ("kg", "g", "mg", "lb", "oz", "ton", "stone"),
+    "area":   ("m²", "km²", "cm²", "mm²", "hectare", "acre", "ft²", "in²", "yd²"),
+    "volume": ("L", "mL", "m³", "cm³", "gallon", "quart", "pint", "cup", "fl oz"),
+    "data":   ("bit", "byte", "KB", "MB", "GB", "TB", "PB"),
+    "time":   ("second", "minute", "hour", "day", "week", "month", "year",
+               "millisecond"),
+    "fuel":   ("L/100km", "km/L", "mpg"),
+    "bandwidth": ("bit/s", "kbit/s", "Mbit/s", "Gbit/s", "KB/s", "MB/s", "GB/s"),
+}
+
+TEMPERATURE_UNITS = ("Celsius", "Fahrenheit", "Kelvin")
+
+NUMERAL_BASES = {"Decimal": 10, "Binary": 2, "Octal": 8, "Hexadecimal": 16}
+NUMERAL_BASES.update((f"Base {b}", b) for b in range(3, 37)
+                     if b not in NUMERAL_BASES.values())
+
+
+_UNIT_SETS = {cat: frozenset(units) for cat, units in UNITS.items()}
+
+
+def _check_units(category, *names):
+    table = _UNIT_SETS[category]
+    for u in names:
+        if u not in table:
+            raise ValueError(f"{u!r} is not a {category} unit")
+
+
+def unit_factor(category, frm, to):
+    """Multiplier taking a value in unit *frm* to unit *to*."""
+    _check_units(category, frm, to)
+    c = conversion(frm, to)
+    if c.inverse or c.offset:
+        raise ValueError(f"{frm} to {to} is not a plain factor")
+    return c.scale
+
+
+def convert_unit(value, category, frm, to):
+    _check_units(category, frm, to)
+    return convert(value, frm, to)
+
+
+def convert_unit_many(values, category, frm, to):
+    _check_units(category, frm, to)
+    a, b, inverse = conversion(frm, to)
+    if inverse:
+        return [a / v if v else math.inf for v in values]
+    return [v * a + b for v in values]
+
+
+def convert_unit_array(values, category, frm, to, out=None):
+    """Convert an array or buffer of floats in one vectorized pass.
+
+    *values* may be a NumPy array, an ``array('d')``, a ``memoryview`` or
+    any sequence.  Returns a float64 ndarray (written into *out* when
+    given).  Without NumPy an ``array('d')`` is returned instead.
+    """
+    _check_units(category, frm, to)
+    a, b, inverse = conversion(frm, to)
+    np = _numpy()
+    if np is None:
+        return array("d", convert_unit_many(values, category, frm, to))
+    x = np.asarray(values, dtype=np.float64)
+    if inverse:
+        with np.errstate(divide="ignore"):
+            return np.divide(a, x, out=out)
+    y = np.multiply(x, a, out=out)
+    return np.add(y, b, out=y) if b else y
+
+
+def convert_temperature(value, frm, to):
+    if frm not in TEMPERATURE_UNITS or to not in TEMPERATURE_UNITS:
+        raise ValueError("unknown temperature unit")
+    return convert(value, frm, to)
+
+
+def convert_temperature_many(values, frm, to):
+    if frm not in TEMPERATURE_UNITS or to not in TEMPERATURE_UNITS:
+        raise ValueError("unknown temperature unit")
+    a, b, _ = conversion(frm, to)
+    return [v * a + b for v in values]
+
+
+# Numerals of any size in bases 2-36.  int()/str() are quadratic for bases
+# that are not powers of two and refuse more than sys.get_int_max_str_digits()
+# digits, so long inputs are split into chunks that stay under the limit and
+# combined divide-and-conquer style; power-of-two bases go straight through
+# int()/format(), which regroup bits in linear time.
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_PREFIXES = {2: "0b", 8: "0o", 16: "0x"}
+_BUILTIN_FORMAT = {2: bin, 8: oct, 16: hex}
+_CHUNK_DIGITS = 2000            # well under the default 4300-digit limit
+
+
+def numeral_base(name):
+    """Base for a NUMERAL_BASES name, a "Base N" string or an int 2-36."""
+    b = NUMERAL_BASES.get(name, name)
+    if isinstance(b, str):
+        raise ValueError(f"unknown base {name!r}")
+    if not 2 <= b <= 36:
+        raise ValueError("base must be between 2 and 36")
+    return b
+
+
+def _pow2_bits(base):
+    """log2(base) for power-of-two bases, else 0."""
+    return base.bit_length() - 1 if base & (base - 1) == 0 else 0
+
+
+class _Accumulator:
+    """Combines digit chunks like a binary counter.
+
+    Chunks of equal digit count are merged as soon as two are on the stack,
+    so every multiplication joins numbers of similar size (subquadratic with
+    Karatsuba) while the digits themselves can be streamed and dropped.
+    """
+
+    def __init__(self, base):
+        self.base  = base
+        self.bits  = _pow2_bits(base)
+        self.stack = []         # (value, digit count), sizes decreasing
+        self._pows = {}
+
+    def _pow(self, k):
+        r = self._pows.get(k)
+        if r is None:
+            r = (self.base ** k if k <= _CHUNK_DIGITS
+                 else self._pow(k >> 1) * self._pow(k - (k >> 1)))
+            self._pows[k] = r
+        return r
+
+    def _join(self, hi, lo):
+        if self.bits:
+            return hi[0] << (self.bits * lo[1]) | lo[0], hi[1] + lo[1]
+        return hi[0] * self._pow(lo[1]) + lo[0], hi[1] + lo[1]
+
+    def push(self, digits):
+        if not (digits.isascii() and digits.isalnum()):
+            raise ValueError(f"invalid digits for base {self.base}")
+        st = self.stack
+        st.append((int(digits, self.base), len(digits)))
+        while len(st) > 1 and st[-2][1] == st[-1][1]:
+            lo = st.pop()
+            st[-1] = self._join(st[-1], lo)
+
+    def value(self):
+        st = self.stack
+        if not st:
+            raise ValueError("no digits")
+        acc = st[-1]
+        for hi in reversed(st[:-1]):
+            acc = self._join(hi, acc)
+        return acc[0]
+
+
+def _split_sign(text, base):
+    text = "".join(text.split()).replace("_", "").lower()
+    sign = 1
+    if text and text[0] in "+-":
+        sign, text = (-1 if text[0] == "-" else 1), text[1:]
+    pre = _PREFIXES.get(base)
+    if pre and text.startswith(pre):
+        text = text[2:]
+    return sign, text
+
+
+def parse_int(text, base):
+    """Integer value of *text* in *base*; no length limit.
+
+    Whitespace and underscores are ignored; a sign and the 0b/0o/0x prefix
+    of the matching base are accepted.
+    """
+    if len(text) <= _CHUNK_DIGITS:
+        try:
+            return int(text, base)          # short input: one C call
+        except ValueError:
+            pass                            # e.g. inner spaces; normalize
+    sign, digits = _split_sign(text, base)
+    if not (digits.isascii() and digits.isalnum()):
+        raise ValueError(f"invalid digits for base {base}")
+    if _pow2_bits(base) or len(digits) <= _CHUNK_DIGITS:
+        return sign * int(digits, base)
+    acc = _Accumulator(base)
+    for i in range(0, len(digits), _CHUNK_DIGITS):
+        acc.push(digits[i:i + _CHUNK_DIGITS])
+    return sign * acc.value()
+
+
+def _recip(d, s):
+    """floor(2**(2*s) / d) for a d of *s* bits, by one Newton step per halving."""
+    if s <= 4000:
+        return (1 << (2 * s)) // d
+    h = (s >> 1) + 16
+    x = _recip((d >> (s - h)) + 1, h) << (s - h)
+    x += (x * ((1 << (2 * s)) - d * x)) >> (2 * s)
+    return x + ((1 << (2 * s)) - d * x) // d
+
+
+def _format_dc(n, base):
+    """Digits of n >= 0 by recursive division by base**(2**k).
+
+    CPython's own long division is quadratic, so each level divides by
+    multiplying with a precomputed reciprocal instead.
+    """
+    pows = [base]
+    while pows[-1].bit_length() * 2 <= n.bit_length() + 1:
+        pows.append(pows[-1] * pows[-1])
+    recips = [None] * len(pows)
+
+    def divmod_pow(m, k):
+        p = pows[k]
+        if k < 10:
+            return divmod(m, p)
+        s = p.bit_length()
+        if recips[k] is None:
+            recips[k] = _recip(p, s)
+        q = (m * recips[k]) >> (2 * s)
+        r = m - q * p
+        while r >= p:
+            q += 1
+            r -= p
+        return q, r
+
+    def small(m):
+        out = []
+        while m:
+            m, r = divmod(m, base)
+            out.append(_DIGITS[r])
+        return "".join(reversed(out))
+
+    def inner(m, k):
+        # m < base**(2**(k+1))
+        if k < 6:
+            return small(m)
+        q, r = divmod_pow(m, k)
+        if not q:
+            return inner(r, k - 1)
+        return inner(q, k - 1) + inner(r, k - 1).rjust(1 << k, "0")
+
+    return inner(n, len(pows) - 1) or "0"
+
+
+def format_int(n, base, prefix=False, pad=0):
+    """Digits of *n* in *base* (lower case), left-padded with zeros to *pad*.
+
+    With *prefix* bases 2, 8 and 16 get 0b/0o/0x as bin()/oct()/hex() do.
+    Decimal uses int_to_str; other bases divide and conquer.
+    """
+    if prefix and not pad and base in _PREFIXES:
+        return _BUILTIN_FORMAT[base](n)
+    neg, m = n < 0, abs(n)
+    bits = _pow2_bits(base)
+    if base == 10:
+        digits = int_to_str(m)
+    elif base in _PREFIXES:
+        digits = format(m, {2: "b", 8: "o", 16: "x"}[base])
+    elif bits:
+        b = format(m, "b")
+        b = b.zfill(-(-len(b) // bits) * bits)
+        digits = "".join(_DIGITS[int(b[i:i + bits], 2)]
+                         for i in range(0, len(b), bits))
+    else:
+        digits = _format_dc(m, base)
+    digits = digits.rjust(pad, "0")
+    return ("-" if neg else "") + (_PREFIXES.get(base, "") if prefix else "") + digits
+
+
+def to_twos(n, width):
+    """Unsigned *width*-bit two's-complement pattern of *n*."""
+    if not -(1 << (width - 1)) <= n < (1 << width):
+        raise OverflowError(f"{n} does not fit in {width} bits")
+    return n & ((1 << width) - 1)
+
+
+def from_twos(u, width):
+    """Signed value of the *width*-bit pattern *u*."""
+    if not 0 <= u < (1 << width):
+        raise OverflowError(f"value does not fit in {width} bits")
+    return u - (1 << width) if u >> (width - 1) else u
+
+
+def _numeral_value(v, b1, b2, width):
+    # Decimal is the signed side, other bases show the bit pattern.
+    if not width:
+        return v, 0
+    if b2 == 10 and b1 != 10:
+        v = from_twos(to_twos(v, width), width)
+    else:
+        v = to_twos(v, width)
+    bits = _pow2_bits(b2)
+    return v, (-(-width // bits) if bits else 0)
+
+
+def convert_numeral(text, frm, to, width=None):
+    """Convert *text* written in base *frm* to base *to*.
+
+    Bases are NUMERAL_BASES names or ints 2-36.  With *width* the non-decimal
+    side is read/written as a *width*-bit two's-complement pattern, e.g.
+    ``convert_numeral("ff", "Hexadecimal", "Decimal", 8) == "-1"``.
+    """
+    b1, b2 = numeral_base(frm), numeral_base(to)
+    v, pad = _numeral_value(parse_int(text, b1), b1, b2, width)
+    return format_int(v, b2, prefix=True, pad=pad)
+
+
+def convert_numeral_many(texts, frm, to, width=None):
+    return [convert_numeral(t, frm, to, width) for t in texts]
+
+
+def convert_numeral_file(src, dst, frm, to, width=None, chunk=1 << 16):
+    """Convert the single number held in text file *src*, writing it to *dst*.
+
+    The input is read in *chunk*-sized pieces (whitespace and underscores
+    ignored) and folded into the value as it arrives; the output is written
+    in pieces too.  Returns the number of digits written.
+    """
+    b1, b2 = numeral_base(frm), numeral_base(to)
+    acc = _Accumulator(b1)
+    step = max(_CHUNK_DIGITS, chunk) if acc.bits else _CHUNK_DIGITS
+    clean = lambda t: "".join(t.split()).replace("_", "").lower()
+    # a sign or 0x-style prefix can only be at the very start
+    sign, pending = _split_sign(src.read(chunk), b1)
+    while True:
+        while len(pending) >= step:
+            acc.push(pending[:step])
+            pending = pending[step:]
+        piece = src.read(chunk)
+        if not piece:
+            break
+        pending += clean(piece)
+    if pending:
+        acc.push(pending)
+    v, pad = _numeral_value(sign * acc.value(), b1, b2, width)
+    out = format_int(v, b2, pad=pad)
+    for i in range(0, len(out), chunk):
+        dst.write(out[i:i + chunk])
+    return len(out.lstrip("-"))
+
+
+# Dates are handled as day numbers (days since 1970-01-01, the numpy
+# datetime64[D] encoding) so whole columns can be processed at once.  The
+# calendar arithmetic below only uses +, -, *, // and comparisons, which
+# work the same on Python ints and on numpy int64 arrays.
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+NO_DATE = -(1 << 63)            # unparseable entries (numpy's NaT)
+
+
+def parse_date(text):
+    """Date from ``YYYY-MM-DD`` text."""
+    return date.fromisoformat(text.strip())
+
+
+def _day_number(v):
+    if not isinstance(v, date):
+        v = date.fromisoformat(v.strip())
+    return v.toordinal() - _EPOCH_ORD
+
+
+def parse_dates(values):
+    """Day numbers for a sequence of ISO strings or dates; NO_DATE if invalid.
+
+    Returns a numpy int64 array when NumPy is installed (parsed in C by
+    datetime64), else an ``array('q')``.  Columns that already hold day
+    numbers (or datetime64 values) are passed through.
+    """
+    if isinstance(values, array) and values.typecode == "q":
+        return values
+    kind = getattr(getattr(values, "dtype", None), "kind", None)
+    if kind == "i":
+        return values
+    if kind == "M":
+        return values.astype("datetime64[D]").astype("int64")
+    vals = values if isinstance(values, (list, tuple)) else list(values)
+    np = _numpy()
+    if np is not None:
+        try:
+            return np.array(vals, dtype="datetime64[D]").astype(np.int64)
+        except (ValueError, TypeError):
+            pass                    # some entry is malformed: go one by one
+    out = array("q", [NO_DATE]) * len(vals)
+    for i, v in enumerate(vals):
+        try:
+            out[i] = _day_number(v)
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return np.asarray(out) if np is not None else out
+
+
+def _civil(z):
+    """(year, month, day) of day number(s) *z* (H. Hinnant's algorithm)."""
+    z = z + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp  = (5 * doy + 2) // 153
+    d   = doy - (153 * mp + 2) // 5 + 1
+    m   = mp + 3 - 12 * (mp >= 10)
+    return yoe + era * 400 + (m <= 2), m, d
+
+
+def _days(y, m, d):
+    """Day number(s) of the given date(s); inverse of _civil."""
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m - 3 + 12 * (m <= 2)) + 2) // 5 + d - 1
+    return era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+
+
+def _month_len(y, m):
+    return _days(y + (m == 12), m % 12 + 1, 1) - _days(y, m, 1)
+
+
+def _span(b, t):
+    """(years, months, days) from day number(s) b to t >= b.
+
+    Months are added calendar-wise with the day clamped to the month's end,
+    so a Feb-29 birthday comes round on Feb 28 in common years.
+    """
+    by, bm, bd = _civil(b)
+    ty, tm, td = _civil(t)
+    months = (ty - by) * 12 + (tm - bm)
+    n = _month_len(ty, tm)
+    months = months - (td < bd + (n - bd) * (n < bd))
+    k  = bm - 1 + months
+    ay = by + k // 12
+    am = k % 12 + 1
+    n  = _month_len(ay, am)
+    return months // 12, months % 12, t - _days(ay, am, bd + (n - bd) * (n < bd))
+
+
+def _span_column(b, t):
+    """_span over columns; rows with a missing date or t < b give -1s."""
+    np = _numpy()
+    if np is not None:
+        b, t = np.asarray(b), np.asarray(t)
+        bad = (b == NO_DATE) | (t == NO_DATE) | (t < b)
+        t = np.where(bad, 0, t)
+        return tuple(np.where(bad, -1, c) for c in _span(np.where(bad, 0, b), t))
+    cols = array("q"), array("q"), array("q")
+    if isinstance(t, int): t = [t] * len(b)
+    for x, y in zip(b, t):
+        parts = (-1, -1, -1) if NO_DATE in (x, y) or y < x else _span(x, y)
+        for c, v in zip(cols, parts):
+            c.append(v)
+    return cols
+
+
+def date_diff(d1, d2):
+    """Absolute number of days between two dates."""
+    return abs((d2 - d1).days)
+
+
+def date_breakdown(d1, d2):
+    """``(days, (weeks, days), (years, months, days))`` between two dates."""
+    a, b = sorted((_day_number(d1), _day_number(d2)))
+    return b - a, divmod(b - a, 7), _span(a, b)
+
+
+def _day_column(values):
+    if isinstance(values, (date, str)):
+        return _day_number(values)
+    return parse_dates(values)
+
+
+def _pair(starts, ends):
+    """Aligned day-number columns; either side may be a single date."""
+    a, b = _day_column(starts), _day_column(ends)
+    np = _numpy()
+    if np is not None:
+        return np.broadcast_arrays(np.asarray(a), np.asarray(b))
+    if isinstance(a, int): a = array("q", [a]) * len(b)
+    if isinstance(b, int): b = array("q", [b]) * len(a)
+    return a, b
+
+
+def _abs_diff(a, b):
+    np = _numpy()
+    if np is not None:
+        return np.where((a == NO_DATE) | (b == NO_DATE), -1, np.abs(b - a))
+    return array("q", (-1 if NO_DATE in (x, y) else abs(y - x) for x, y in zip(a, b)))
+
+
+def date_diff_array(starts, ends):
+    """Absolute day differences of two date columns; -1 where a date is
+    missing or malformed."""
+    return _abs_diff(*_pair(starts, ends))
+
+
+def date_diff_many(starts, ends):
+    return date_diff_array(starts, ends).tolist()
+
+
+def date_breakdown_array(starts, ends):
+    """Column form of date_breakdown: ``(days, weeks, week_days, years,
+    months, month_days)``, -1 where a date is missing or malformed."""
+    a, b = _pair(starts, ends)
+    days = _abs_diff(a, b)
+    np = _numpy()
+    # NO_DATE sorts first, so a missing date always ends up in lo
+    if np is not None:
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        weeks = np.where(days >= 0, days // 7, -1)
+        wdays = np.where(days >= 0, days % 7, -1)
+    else:
+        lo, hi = array("q", map(min, a, b)), array("q", map(max, a, b))
+        weeks = array("q", (d // 7 if d >= 0 else -1 for d in days))
+        wdays = array("q", (d % 7 if d >= 0 else -1 for d in days))
+    return (days, weeks, wdays) + tuple(_span_column(lo, hi))
+
+
+def age(dob, today=None):
+    """Return ``(years, months, days)`` from *dob* to *today*."""
+    if today is None: today = date.today()
+    b, t = _day_number(dob), _day_number(today)
+    if t < b:
+        raise ValueError("date of birth is in the future")
+    return _span(b, t)
+
+
+def age_array(dobs, today=None):
+    """``(years, months, days)`` columns for a column of birth dates.
+
+    Rows with a malformed date or a birth date after *today* give -1s.
+    """
+    t = _day_number(today or date.today())
+    return _span_column(parse_dates(dobs), t)
+
+
+def age_many(dobs, today=None):
+    return list(zip(*(c.tolist() for c in age_array(dobs, today))))
+
+
+def bmi(weight_kg, height_cm):
+    """Return ``(bmi, category)`` for a weight in kg and height in cm."""
+    h = height_cm / 100
+    val = round(weight_kg / h**2, 2)
+    cat = ("Underweight" if val < 18.5 else "Normal weight" if val < 25
+           else "Overweight" if val < 30 else "Obese")
+    return val, cat
+
+
+def bmi_many(weights, heights):
+    return [bmi(w, h) for w, h in zip(weights, heights)]
+
+
+def discount(price, pct):
+    """Return ``(saved, final)`` for *price* reduced by *pct* percent."""
+    saved = round(price * pct / 100, 2)
+    return saved, round(price - saved, 2)
+
+
+def discount_many(prices, pcts):
+    return [discount(p, d) for p, d in zip(prices, pcts)]
@@ -0,0 +1,168 @@
+"""Persistent calculation history tape.
+
+Entries are appended to a binary log (``<path>.log``) and their byte
+offsets to a fixed-width index (``<path>.idx``).  Both files are read
+through mmap, so:
+
+* ``tape[n]`` reads one 8-byte offset and one record: O(1) for any n;
+* ``search()`` scans the mapped log with ``mmap.find`` (C speed, nothing is
+  loaded into Python objects) and maps each hit back to its entry by
+  bisecting the offset index;
+* only the newest ``recent`` entries are kept in memory, in a ring buffer.
+
+Record layout (little endian)::
+
+    float64 time | uint32 len(expr) | uint32 len(display) | uint32 len(result)
+    expr | display | result              (UTF-8)
+
+``expr`` is the engine text, ``display`` what the user saw, ``result`` the
+formatted result.  Searches look at display and result.
+"""
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+from collections import deque, namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".smartcalc", "history")
+
+Entry = namedtuple("Entry", "index time expr display result")
+
+_HDR = struct.Struct("<dIII")
+_OFF = struct.Struct("<Q")
+
+
+class HistoryTape:
+    def __init__(self, path, recent=256):
+        self.path = path
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._log = open(path + ".log", "a+b")
+        self._idx = open(path + ".idx", "a+b")
+        self._log_map = self._idx_map = None
+        self._recover()
+        self._count = self._size(self._idx) // _OFF.size
+        self._end = self._size(self._log)
+        self._ring = deque(maxlen=recent)
+        if self._count:
+            mm, offs = self._maps()
+            for i in range(max(0, self._count - recent), self._count):
+                self._ring.append(self._read(mm, i, offs[i]))
+
+    @staticmethod
+    def _size(f):
+        return os.fstat(f.fileno()).st_size
+
+    def _recover(self):
+        """Drop a half-written tail left by a crash between the two writes."""
+        n = self._size(self._idx) // _OFF.size
+        self._idx.truncate(n * _OFF.size)
+        log_size = self._size(self._log)
+        while n:
+            self._idx.seek((n - 1) * _OFF.size)
+            off, = _OFF.unpack(self._idx.read(_OFF.size))
+            if off + _HDR.size <= log_size:
+                self._log.seek(off)
+                _, a, b, c = _HDR.unpack(self._log.read(_HDR.size))
+                end = off + _HDR.size + a + b + c
+                if end <= log_size:
+                    self._log.truncate(end)
+                    return
+            n -= 1
+            self._idx.truncate(n * _OFF.size)
+        self._log.truncate(0)
+
+    def _maps(self):
+        """Return (log map, index view), remapping if the files grew."""
+        if self._count == 0:
+            return None, ()
+        if self._log_map is None or len(self._log_map) < self._end:
+            if self._log_map is not None:
+                self._idx_view.release()
+                self._idx_map.close()
+                self._log_map.close()
+            self._log.flush()
+            self._idx.flush()
+            self._log_map = mmap.mmap(self._log.fileno(), 0, access=mmap.ACCESS_READ)
+            self._idx_map = mmap.mmap(self._idx.fileno(), 0, access=mmap.ACCESS_READ)
+            self._idx_view = memoryview(self._idx_map).cast("Q")
+        return self._log_map, self._idx_view[:self._count]
+
+    def __len__(self):
+        return self._count
+
+    def append(self, expr, display, result, when=None):
+        """Append one entry and return its index."""
+        fields = [s.encode("utf-8") for s in (expr, display, result)]
+        rec = _HDR.pack(time.time() if when is None else when,
+                        *map(len, fields)) + b"".join(fields)
+        off = self._end
+        self._log.write(rec)
+        self._log.flush()
+        self._idx.write(_OFF.pack(off))
+        self._idx.flush()
+        self._end += len(rec)
+        entry = Entry(self._count, *_HDR.unpack_from(rec)[:1], expr, display, result)
+        self._count += 1
+        self._ring.append(entry)
+        return entry.index
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError("history index out of range")
+        if n >= self._count - len(self._ring):
+            return self._ring[n - (self._count - len(self._ring))]
+        mm, offs = self._maps()
+        return self._read(mm, n, offs[n])
+
+    @staticmethod
+    def _read(mm, n, off):
+        when, a, b, c = _HDR.unpack_from(mm, off)
+        p = off + _HDR.size
+        return Entry(n, when, mm[p:p + a].decode("utf-8"),
+                     mm[p + a:p + a + b].decode("utf-8"),
+                     mm[p + a + b:p + a + b + c].decode("utf-8"))
+
+    def recent(self):
+        """Newest entries first, from the in-memory ring."""
+        return list(reversed(self._ring))
+
+    def search(self, text, prefix=False, limit=100):
+        """Entries whose display (or result) contains *text*, newest first.
+
+        With *prefix* only entries whose display starts with *text* match.
+        """
+        needle = text.encode("utf-8")
+        if not needle:
+            return self.recent()[:limit]
+        mm, offs = self._maps()
+        if mm is None:
+            return []
+        hits = []
+        seen = -1
+        pos = mm.rfind(needle, 0, self._end)
+        while pos >= 0 and len(hits) < limit:
+            n = bisect_right(offs, pos) - 1
+            off = offs[n]
+            _, a, b, c = _HDR.unpack_from(mm, off)
+            disp = off + _HDR.size + a
+            lo, hi = (disp, disp) if prefix else (disp, disp + b + c - len(needle))
+            if n != seen and lo <= pos <= hi:
+                hits.append(self._read(mm, n, off))
+                seen = n
+            # continue before this record once it matched or can't match
+            pos = mm.rfind(needle, 0, (off if n == seen or pos < lo else pos + len(needle) - 1))
+        return hits
+
+    def close(self):
+        if self._log_map is not None:
+            self._idx_view.release()
+            self._idx_map.close()
+            self._log_map.close()
+            self._log_map = None
+        self._log.close()
+        self._idx.close()
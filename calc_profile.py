@@ -0,0 +1,163 @@
+"""Opt-in timing instrumentation.
+
+Set ``CALC_PROFILE`` before starting the calculator:
+
+    CALC_PROFILE=1         timing histograms for every @instrument'ed call
+    CALC_PROFILE=cprofile  the same, plus a cProfile run of the whole session
+
+On exit the results go to ``$CALC_PROFILE_OUT`` (default ``calc_profile``):
+``<out>.json`` holds per-function histograms and a Chrome-trace style event
+list (open it in chrome://tracing or Perfetto), ``<out>.pstats`` the cProfile
+data (``python -m pstats calc_profile.pstats``).
+
+When the variable is unset ``instrument`` returns the function itself, so
+instrumented code runs exactly as before.  A cProfile run can still be
+started and stopped from the GUI (Ctrl+Alt+P); that costs nothing while off.
+"""
+import atexit
+import cProfile
+import json
+import os
+import time
+from collections import deque
+from functools import wraps
+
+_MODE   = os.environ.get("CALC_PROFILE", "").strip().lower()
+ENABLED = _MODE not in ("", "0", "off", "no")
+OUT     = os.environ.get("CALC_PROFILE_OUT", "calc_profile")
+
+MAX_EVENTS = 200_000       # trace events kept (oldest dropped)
+
+
+class Histogram:
+    """Call count, total and power-of-two µs buckets for one function."""
+    __slots__ = ("count", "total", "worst", "buckets")
+
+    def __init__(self):
+        self.count   = 0
+        self.total   = 0.0
+        self.worst   = 0.0
+        self.buckets = [0] * 32     # bucket i: [2**(i-1), 2**i) µs
+
+    def add(self, dt):
+        self.count += 1
+        self.total += dt
+        if dt > self.worst: self.worst = dt
+        self.buckets[min(31, int(dt * 1e6).bit_length())] += 1
+
+    def percentile(self, q):
+        """Upper bound (µs) of the bucket holding the q-quantile."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return float(1 << i)
+        return 0.0
+
+    def as_dict(self):
+        return {"count": self.count, "total_ms": self.total * 1e3,
+                "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+                "p50_us_le": self.percentile(0.5), "p99_us_le": self.percentile(0.99),
+                "max_us": self.worst * 1e6,
+                "buckets_us": {f"<{1 << i}": n for i, n in enumerate(self.buckets) if n}}
+
+
+HISTOGRAMS = {}
+EVENTS = deque(maxlen=MAX_EVENTS)
+_T0 = time.perf_counter()
+
+
+def instrument(name=None):
+    """Decorator timing each call into ``HISTOGRAMS[name]``.
+
+    Returns the function unchanged unless profiling is enabled.
+    """
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+        hist = HISTOGRAMS.setdefault(label, Histogram())
+        timer = time.perf_counter
+
+        @wraps(fn)
+        def timed(*args, **kw):
+            t0 = timer()
+            try:
+                return fn(*args, **kw)
+            finally:
+                t1 = timer()
+                hist.add(t1 - t0)
+                EVENTS.append((label, t0, t1))
+        return timed
+    return deco
+
+
+def instrument_methods(cls, *names):
+    """Apply ``instrument`` to methods defined (or inherited) on *cls*."""
+    if not ENABLED:
+        return cls
+    for n in names:
+        fn = getattr(cls, n, None)
+        if fn is not None:
+            setattr(cls, n, instrument(f"{cls.__name__}.{n}")(fn))
+    return cls
+
+
+# ── cProfile ───────────────────────────────────────────────────────────────
+_profiler = None
+
+
+def profiling():
+    return _profiler is not None
+
+
+def start_cprofile():
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_cprofile(path=None):
+    """Stop a running cProfile session and write its stats; returns the path."""
+    global _profiler
+    if _profiler is None:
+        return None
+    _profiler.disable()
+    path = path or OUT + ".pstats"
+    _profiler.dump_stats(path)
+    _profiler = None
+    return path
+
+
+def toggle_cprofile():
+    """Start profiling, or stop and dump; returns the stats path when stopped."""
+    if _profiler is None:
+        start_cprofile()
+        return None
+    return stop_cprofile()
+
+
+def dump(path=None):
+    """Write histograms and the trace as JSON; returns the path."""
+    path = path or OUT + ".json"
+    doc = {"histograms": {k: h.as_dict() for k, h in sorted(HISTOGRAMS.items())
+                          if h.count},
+           "traceEvents": [{"name": n, "ph": "X", "pid": 0, "tid": 0,
+                            "ts": (t0 - _T0) * 1e6, "dur": (t1 - t0) * 1e6}
+                           for n, t0, t1 in EVENTS]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    return path
+
+
+def _at_exit():
+    stop_cprofile()
+    dump()
+
+
+if ENABLED:
+    if _MODE == "cprofile":
+        start_cprofile()
+    atexit.register(_at_exit)
@@ -0,0 +1,593 @@
+"""Local JSON-RPC service for the calculator's math.
+
+Newline-delimited JSON-RPC 2.0 over TCP or a Unix socket::
+
+    python calc_server.py serve --port 8765
+    python calc_server.py serve --unix /tmp/calc.sock
+    python calc_server.py bench --connections 8 --requests 20000 --batch 100
+
+One request per line, e.g.::
+
+    {"jsonrpc": "2.0", "id": 1, "method": "eval", "params": {"expr": "sin(30)"}}
+    {"jsonrpc": "2.0", "id": 2, "method": "unit_many",
+     "params": {"values": [1, 2, 3], "from": "km", "to": "mile"}}
+
+A line holding a JSON array is a JSON-RPC batch and gets one array back.
+Methods mirror calc_core: ``eval``, ``unit``, ``temperature``, ``numeral``,
+``date``, ``age``, ``bmi``, ``discount`` and a ``*_many`` form of each taking
+columns; failed items of a ``*_many`` call are ``null``.
+
+Connections are kept alive until the client closes them or they idle for
+IDLE_TIMEOUT seconds.  Responses may arrive out of order.  Each connection
+has at most MAX_INFLIGHT requests in progress; beyond that the server stops
+reading the socket until responses have been written out, so a client that
+floods or does not read is throttled by TCP.  Exact evaluations, long
+numerals and batches larger than INLINE_ITEMS run in a process pool; the
+rest are answered on the event loop.
+
+``bench`` is a load generator: it starts a server in a subprocess (unless
+an address is given), pipelines requests over several connections and
+reports requests/sec, items/sec and latency percentiles.
+"""
+import argparse
+import asyncio
+import concurrent.futures as cf
+import json
+import math
+import multiprocessing as mp
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from fractions import Fraction
+
+from calc_core import (evaluate, evaluate_many, fmt, full_digits, convert, conversion,
+                       convert_temperature, convert_temperature_many,
+                       convert_numeral, convert_numeral_many, date_breakdown,
+                       date_breakdown_array, age, age_many, bmi, bmi_many,
+                       discount, discount_many)
+
+MAX_LINE      = 32 << 20        # bytes per request line
+MAX_INFLIGHT  = 64              # requests in progress per connection
+IDLE_TIMEOUT  = 300.0           # seconds without a request before closing
+CALL_TIMEOUT  = 30.0            # seconds per pooled call
+INLINE_ITEMS  = 256             # larger batches go to the pool
+INLINE_DIGITS = 2000            # longer numerals go to the pool
+
+PARSE_ERROR, INVALID_REQUEST, NO_METHOD, INVALID_PARAMS, CALC_ERROR = \
+    -32700, -32600, -32601, -32602, -32000
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  METHODS
+# ════════════════════════════════════════════════════════════════════════════
+# Each method takes the params dict and returns a JSON-serializable result.
+# They are module-level so the process pool can pickle them by name.
+
+def _number(v):
+    """JSON value for a calculator result: a number where a double holds it
+    exactly, all digits as a string for exact ints and fractions, the
+    summary text for magnitudes and null for inf/NaN."""
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    if isinstance(v, int) and abs(v) < 1 << 53:
+        return v
+    if isinstance(v, (int, Fraction)):
+        return full_digits(v)
+    return fmt(v)
+
+
+def _tolist(col):
+    return col.tolist() if hasattr(col, "tolist") else list(col)
+
+
+def _each(f, *cols):
+    out = []
+    for args in zip(*cols):
+        try:
+            out.append(f(*args))
+        except (ArithmeticError, ValueError, TypeError, SyntaxError):
+            out.append(None)
+    return out
+
+
+def _finite(v, name):
+    v = float(v)
+    if not math.isfinite(v):
+        raise ValueError(f"{name} must be finite")
+    return v
+
+
+def m_eval(p):
+    x, ans, exact = p.get("x", 0.0), p.get("ans", 0), p.get("exact", False)
+    if not exact:
+        # JSON integers would otherwise stay ints and make ** exact bignum
+        # work on the event loop; float mode means floats throughout.
+        x, ans = _finite(x, "x"), _finite(ans, "ans")
+    v = evaluate(p["expr"], p.get("angle_mode", "DEG"), x, exact, ans)
+    return {"value": _number(v), "text": fmt(v)}
+
+
+def m_eval_many(p):
+    if p.get("exact"):
+        mode = p.get("angle_mode", "DEG")
+        return _each(lambda e: _number(evaluate(e, mode, exact=True)), p["exprs"])
+    return [None if v is None else _number(v)
+            for v in evaluate_many(p["exprs"], p.get("angle_mode", "DEG"))]
+
+
+def m_unit(p):
+    return _number(convert(p["value"], p["from"], p["to"]))
+
+
+def m_unit_many(p):
+    a, b, inverse = conversion(p["from"], p["to"])
+    f = (lambda v: _number(a / v)) if inverse else (lambda v: _number(v * a + b))
+    return _each(f, p["values"])
+
+
+def m_temperature(p):
+    return _number(convert_temperature(p["value"], p["from"], p["to"]))
+
+
+def m_temperature_many(p):
+    return [_number(v) for v in convert_temperature_many(p["values"], p["from"], p["to"])]
+
+
+def m_numeral(p):
+    return convert_numeral(p["value"], p["from"], p["to"], p.get("width"))
+
+
+def m_numeral_many(p):
+    frm, to, width = p["from"], p["to"], p.get("width")
+    try:
+        return convert_numeral_many(p["values"], frm, to, width)
+    except (ValueError, OverflowError):
+        return _each(lambda t: convert_numeral(t, frm, to, width), p["values"])
+
+
+def m_date(p):
+    days, (weeks, wdays), ymd = date_breakdown(p["a"], p["b"])
+    return {"days": days, "weeks": [weeks, wdays], "ymd": list(ymd)}
+
+
+def m_date_many(p):
+    cols = [_tolist(c) for c in date_breakdown_array(p["a"], p["b"])]
+    return {k: c for k, c in zip(("days", "weeks", "week_days", "years",
+                                  "months", "month_days"), cols)}
+
+
+def m_age(p):
+    return list(age(p["dob"], p.get("today")))
+
+
+def m_age_many(p):
+    return [None if y < 0 else [y, m, d]
+            for y, m, d in age_many(p["dobs"], p.get("today"))]
+
+
+def m_bmi(p):
+    return list(bmi(p["weight"], p["height"]))
+
+
+def m_bmi_many(p):
+    try:
+        return [list(r) for r in bmi_many(p["weights"], p["heights"])]
+    except (ArithmeticError, TypeError):
+        return _each(lambda w, h: list(bmi(w, h)), p["weights"], p["heights"])
+
+
+def m_discount(p):
+    return list(discount(p["price"], p["percent"]))
+
+
+def m_discount_many(p):
+    try:
+        return [list(r) for r in discount_many(p["prices"], p["percents"])]
+    except TypeError:
+        return _each(lambda a, b: list(discount(a, b)), p["prices"], p["percents"])
+
+
+METHODS = {"eval": m_eval, "eval_many": m_eval_many,
+           "unit": m_unit, "unit_many": m_unit_many,
+           "temperature": m_temperature, "temperature_many": m_temperature_many,
+           "numeral": m_numeral, "numeral_many": m_numeral_many,
+           "date": m_date, "date_many": m_date_many,
+           "age": m_age, "age_many": m_age_many,
+           "bmi": m_bmi, "bmi_many": m_bmi_many,
+           "discount": m_discount, "discount_many": m_discount_many}
+
+# Column parameter of each *_many method, used to size the batch.
+_BATCH_PARAM = {"eval_many": "exprs", "unit_many": "values",
+                "temperature_many": "values", "numeral_many": "values",
+                "date_many": "a", "age_many": "dobs", "bmi_many": "weights",
+                "discount_many": "prices"}
+
+
+# JSON type of each parameter, checked before a method runs.  Missing
+# parameters and nulls are left to the method (KeyError, optional values).
+_NUM, _INT, _STR, _LIST, _BOOL = ((int, float), "a number"), ((int,), "an integer"), \
+    ((str,), "a string"), ((list,), "an array"), ((bool,), "a boolean")
+_BASE  = ((str, int), "a string or an integer")
+_DATES = ((str, list), "a string or an array")
+_PARAMS = {
+    "eval":        {"expr": _STR, "angle_mode": _STR, "x": _NUM, "ans": _NUM, "exact": _BOOL},
+    "eval_many":   {"exprs": _LIST, "angle_mode": _STR, "exact": _BOOL},
+    "unit":        {"value": _NUM, "from": _STR, "to": _STR},
+    "unit_many":   {"values": _LIST, "from": _STR, "to": _STR},
+    "temperature": {"value": _NUM, "from": _STR, "to": _STR},
+    "temperature_many": {"values": _LIST, "from": _STR, "to": _STR},
+    "numeral":     {"value": _STR, "from": _BASE, "to": _BASE, "width": _INT},
+    "numeral_many": {"values": _LIST, "from": _BASE, "to": _BASE, "width": _INT},
+    "date":        {"a": _STR, "b": _STR},
+    "date_many":   {"a": _DATES, "b": _DATES},
+    "age":         {"dob": _STR, "today": _STR},
+    "age_many":    {"dobs": _LIST, "today": _STR},
+    "bmi":         {"weight": _NUM, "height": _NUM},
+    "bmi_many":    {"weights": _LIST, "heights": _LIST},
+    "discount":    {"price": _NUM, "percent": _NUM},
+    "discount_many": {"prices": _LIST, "percents": _LIST},
+}
+
+
+def _bad_param(method, p):
+    """Message for the first parameter of the wrong type, else None."""
+    for name, (types, what) in _PARAMS[method].items():
+        v = p.get(name)
+        if v is not None and (not isinstance(v, types)
+                              or isinstance(v, bool) and bool not in types):
+            return f"parameter {name!r} must be {what}"
+    return None
+
+
+def _heavy(method, p):
+    """Whether a call should leave the event loop."""
+    if method in _BATCH_PARAM:
+        col = p.get(_BATCH_PARAM[method])
+        return isinstance(col, list) and len(col) > INLINE_ITEMS
+    if method == "eval":
+        return bool(p.get("exact"))
+    if method == "numeral":
+        return len(str(p.get("value", ""))) > INLINE_DIGITS
+    return False
+
+
+def call(method, params):
+    """Run one method; ``(True, result)`` or ``(False, (code, message))``."""
+    f = METHODS.get(method)
+    if f is None:
+        return False, (NO_METHOD, f"unknown method {method!r}")
+    bad = _bad_param(method, params)
+    if bad is not None:
+        return False, (INVALID_PARAMS, bad)
+    try:
+        return True, f(params)
+    except KeyError as ex:
+        return False, (INVALID_PARAMS, f"missing parameter {ex.args[0]!r}")
+    except SyntaxError:
+        return False, (CALC_ERROR, "Syntax Error")
+    except OverflowError:
+        return False, (CALC_ERROR, "Result too large")
+    except ZeroDivisionError:
+        return False, (CALC_ERROR, "Division by zero")
+    except MemoryError:
+        return False, (CALC_ERROR, "Out of memory")
+    except RecursionError:
+        return False, (CALC_ERROR, "Expression too deeply nested")
+    except (ArithmeticError, ValueError) as ex:
+        return False, (CALC_ERROR, str(ex) or "Math Error")
+    except (TypeError, AttributeError, IndexError):
+        # e.g. a column holding the wrong kind of values; Python's own
+        # message would name internals, not the request
+        return False, (INVALID_PARAMS, "invalid parameters")
+    except Exception:
+        return False, (CALC_ERROR, "Math Error")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  SERVER
+# ════════════════════════════════════════════════════════════════════════════
+
+_CLOSE = object()                # ends a connection's write loop
+
+
+def _reply(rid, ok, payload):
+    if ok:
+        return {"jsonrpc": "2.0", "id": rid, "result": payload}
+    code, msg = payload
+    return {"jsonrpc": "2.0", "id": rid, "error": {"code": code, "message": msg}}
+
+
+class CalcServer:
+    """Serves METHODS; *workers* processes take the heavy calls."""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._pool_slots = None
+        self._conns = {}                # handler task -> its reader
+        self.served = 0
+
+    async def _run(self, method, params):
+        if not isinstance(params, dict):
+            return False, (INVALID_PARAMS, "params must be an object")
+        if not _heavy(method, params):
+            return call(method, params)
+        if self._pool is None:
+            self._pool = cf.ProcessPoolExecutor(self.workers,
+                                                mp_context=mp.get_context("spawn"))
+            self._pool_slots = asyncio.Semaphore(self.workers * 4)
+        loop = asyncio.get_running_loop()
+        async with self._pool_slots:            # bound the pool's queue too
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._pool, call, method, params),
+                    CALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                return False, (CALC_ERROR, "Timeout")
+            except cf.process.BrokenProcessPool:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+                return False, (CALC_ERROR, "Worker died")
+
+    async def _one(self, req):
+        if not isinstance(req, dict) or not isinstance(req.get("method"), str):
+            return _reply(req.get("id") if isinstance(req, dict) else None,
+                          False, (INVALID_REQUEST, "invalid request"))
+        ok, res = await self._run(req["method"], req.get("params", {}))
+        self.served += 1
+        return None if "id" not in req else _reply(req["id"], ok, res)
+
+    async def _handle_line(self, line):
+        try:
+            req = json.loads(line)
+        except ValueError:
+            return _reply(None, False, (PARSE_ERROR, "parse error"))
+        if isinstance(req, list):
+            if not req:
+                return _reply(None, False, (INVALID_REQUEST, "empty batch"))
+            out = [r for r in await asyncio.gather(*map(self._one, req))
+                   if r is not None]
+            return out or None
+        return await self._one(req)
+
+    async def handle(self, reader, writer):
+        inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        out = asyncio.Queue()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                resp = await self._handle_line(line)
+            except Exception:
+                resp = _reply(None, False, (CALC_ERROR, "internal error"))
+            out.put_nowait(resp)
+
+        async def write_loop():
+            broken = False
+            while True:
+                resp = await out.get()
+                if resp is _CLOSE: return
+                if resp is not None and not broken:
+                    try:
+                        writer.write(json.dumps(resp, separators=(",", ":")).encode()
+                                     + b"\n")
+                        await writer.drain()
+                    except (ConnectionError, OSError):
+                        broken = True               # keep draining the queue
+                        writer.transport.abort()    # and let readline see EOF
+                inflight.release()
+
+        writing = asyncio.create_task(write_loop())
+        self._conns[asyncio.current_task()] = reader
+        try:
+            while True:
+                await inflight.acquire()        # backpressure: stop reading
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, ValueError, ConnectionError, OSError):
+                    break                       # idle, oversized line or reset
+                if not line:
+                    break
+                if not line.strip():
+                    inflight.release(); continue
+                t = asyncio.create_task(respond(line))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            out.put_nowait(_CLOSE)
+            await writing
+        finally:
+            del self._conns[asyncio.current_task()]
+            writing.cancel()
+            for t in tasks: t.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def serve(self, host="127.0.0.1", port=8765, unix=None, ready=None):
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        if ready is not None:
+            ready(server)
+        # On SIGTERM open connections answer what they have read and close,
+        # then the pool is shut down; its workers are not left orphaned.
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except NotImplementedError:         # no signal handlers on Windows
+            pass
+        try:
+            async with server:
+                await stop.wait()
+                server.close()
+                for reader in self._conns.values():
+                    reader.feed_eof()
+                if self._conns:
+                    await asyncio.wait(list(self._conns), timeout=5)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  LOAD GENERATOR
+# ════════════════════════════════════════════════════════════════════════════
+
+BENCH_EXPRS = ["1+2", "3.5*4-2/7", "(1+2)*(3+4)/(5-6)", "2^10", "sin(30)+cos(60)",
+               "tan(45)*ln(e)", "√(2)+∛(27)", "log(1000)*π", "5!+3!", "asin(0.5)"]
+
+
+def bench_request(method, batch, i):
+    """Params for request *i* of a load run."""
+    if method == "eval":
+        if batch > 1:
+            return "eval_many", {"exprs": [BENCH_EXPRS[(i + k) % len(BENCH_EXPRS)]
+                                           for k in range(batch)]}
+        return "eval", {"expr": BENCH_EXPRS[i % len(BENCH_EXPRS)]}
+    if method == "unit":
+        if batch > 1:
+            return "unit_many", {"values": [float(i + k) for k in range(batch)],
+                                 "from": "km", "to": "mile"}
+        return "unit", {"value": float(i), "from": "km", "to": "mile"}
+    if method == "bmi":
+        if batch > 1:
+            return "bmi_many", {"weights": [50.0 + (i + k) % 60 for k in range(batch)],
+                                "heights": [170.0] * batch}
+        return "bmi", {"weight": 50.0 + i % 60, "height": 170.0}
+    raise ValueError(f"no load profile for {method!r}")
+
+
+async def _open(host, port, unix):
+    if unix:
+        return await asyncio.open_unix_connection(unix, limit=MAX_LINE)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE)
+
+
+async def _client(addr, n, first, method, batch, depth, lat):
+    reader, writer = await _open(*addr)
+    sent = {}
+    window = asyncio.Semaphore(depth)
+    errors = 0
+
+    async def send():
+        for i in range(first, first + n):
+            await window.acquire()
+            name, params = bench_request(method, batch, i)
+            sent[i] = time.perf_counter()
+            writer.write(json.dumps({"jsonrpc": "2.0", "id": i, "method": name,
+                                     "params": params}).encode() + b"\n")
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in range(n):
+        resp = json.loads(await reader.readline())
+        lat.append(time.perf_counter() - sent.pop(resp["id"]))
+        errors += "error" in resp
+        window.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def load(host="127.0.0.1", port=8765, unix=None, connections=4,
+               requests=10000, method="eval", batch=1, depth=16):
+    """Drive a running server; returns a results dict."""
+    lat = []
+    per = [requests // connections + (c < requests % connections)
+           for c in range(connections)]
+    starts = [sum(per[:c]) for c in range(connections)]
+    t0 = time.perf_counter()
+    errors = await asyncio.gather(*(
+        _client((host, port, unix), per[c], starts[c], method, batch, depth, lat)
+        for c in range(connections)))
+    dt = time.perf_counter() - t0
+    lat.sort()
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1e3 if lat else 0.0
+    return {"requests": requests, "items": requests * batch, "errors": sum(errors),
+            "seconds": dt, "req_per_sec": requests / dt,
+            "items_per_sec": requests * batch / dt,
+            "p50_ms": pct(0.50), "p99_ms": pct(0.99),
+            "max_ms": lat[-1] * 1e3 if lat else 0.0}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _spawn_server(workers):
+    port = _free_port()
+    cmd = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(port)]
+    if workers: cmd += ["--workers", str(workers)]
+    proc = subprocess.Popen(cmd)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            if proc.poll() is not None: break
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="calc_server",
+                                 description="Calculator JSON-RPC service.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=None)
+        p.add_argument("--unix", help="Unix socket path instead of TCP")
+        p.add_argument("--workers", type=int, help="pool processes (default: all cores)")
+    b = sub.choices["bench"]
+    b.add_argument("--connections", type=int, default=4)
+    b.add_argument("--requests", type=int, default=10000)
+    b.add_argument("--method", default="eval", choices=("eval", "unit", "bmi"))
+    b.add_argument("--batch", type=int, default=1, help="items per request")
+    b.add_argument("--depth", type=int, default=16, help="pipelined requests per connection")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        srv = CalcServer(args.workers)
+        where = args.unix or f"{args.host}:{args.port or 8765}"
+        try:
+            asyncio.run(srv.serve(args.host, args.port or 8765, args.unix,
+                                  ready=lambda s: print(f"calc_server: listening on {where}",
+                                                        file=sys.stderr)))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    proc = None
+    host, port = args.host, args.port
+    if port is None and not args.unix:
+        proc, port = _spawn_server(args.workers)
+    try:
+        res = asyncio.run(load(host, port, args.unix, args.connections,
+                               args.requests, args.method, args.batch, args.depth))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill(); proc.wait()
+    print(json.dumps(res, indent=2))
+    return 1 if res["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Parameter-sweep tables.
+
+Evaluates a quantity over a grid of x values (rows) and, optionally, y
+values (columns) and writes the table to CSV or ``.npy``::
+
+    python calc_sweep.py bmi --x 40:150:111 --y 140:210:71 -o bmi.csv
+    python calc_sweep.py discount --x 10:1000:100 --y 0:50:11 -o sale.csv
+    python calc_sweep.py expr "sin(x)*y" --x 0:360:3601 --y 1:10:10 -o t.npy
+
+Kinds: ``bmi`` (x = weight kg, y = height cm, as on the BMI page),
+``discount`` (x = price, y = percent, final price as on the Discount page)
+and ``expr`` (any scientific expression in ``x`` and ``y``).
+
+Row blocks are evaluated in a spawn-context process pool and written as
+they complete: ``.npy`` output is preallocated and each block lands at its
+own offset, CSV blocks are written in row order as soon as their
+predecessors are done.  Values that are undefined are written as empty
+CSV fields / NaN.
+"""
+import argparse
+import concurrent.futures as cf
+import math
+import multiprocessing as mp
+import os
+import struct
+import sys
+import time
+from array import array
+
+from calc_core import bmi, discount, compile_expr, compile_vector, tokenize
+
+KINDS = ("bmi", "discount", "expr")
+
+
+def grid(spec):
+    """Values for ``start:stop:count`` (inclusive, evenly spaced) or ``a,b,c``."""
+    if ":" in spec:
+        start, stop, n = spec.split(":")
+        start, stop, n = float(start), float(stop), int(n)
+        if n < 1:
+            raise ValueError("grid needs at least one point")
+        if n == 1:
+            return [start]
+        step = (stop - start) / (n - 1)
+        return [start + i * step for i in range(n)]
+    return [float(v) for v in spec.split(",")]
+
+
+def _xy_text(text):
+    """Expression text with the name ``y`` mapped onto the ``ans`` slot."""
+    out, last = [], 0
+    for kind, val, pos in tokenize(text):
+        if kind == "name" and val == "y":
+            out.append(text[last:pos] + "ans")
+            last = pos + 1
+    return "".join(out) + text[last:]
+
+
+def _nan_on_error(f):
+    def g(x, y):
+        try:
+            return f(x, y)
+        except (ArithmeticError, ValueError):
+            return math.nan
+    return g
+
+
+_SCALAR = {"bmi":      _nan_on_error(lambda w, h: bmi(w, h)[0]),
+           "discount": _nan_on_error(lambda p, d: discount(p, d)[1])}
+
+
+def _block(kind, text, angle_mode, xs, ys):
+    """Values for rows *xs* × columns *ys*, row-major, as float64 bytes."""
+    if kind == "expr":
+        f = compile_vector(text, angle_mode)
+        try:
+            import numpy as np
+        except ImportError:
+            out = array("d")
+            for x in xs:
+                out.extend(f([x] * len(ys), ys))
+            return out.tobytes()
+        v = f(np.asarray(xs)[:, None], np.asarray(ys)[None, :])
+        return np.ascontiguousarray(v, dtype="<f8").tobytes()
+    g = _SCALAR[kind]
+    return array("d", [g(x, y) for x in xs for y in ys]).tobytes()
+
+
+def _npy_header(rows, cols):
+    """NPY format 1.0 header for a C-order float64 (rows, cols) array."""
+    d = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, cols)
+    pad = 64 - (10 + len(d) + 1) % 64
+    d += " " * pad + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(d)) + d.encode("latin1")
+
+
+class _CSVSink:
+    def __init__(self, path, xs, ys, label):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.xs, self.ys = xs, ys
+        self.next_row = 0
+        self.waiting = {}
+        self.f.write(",".join([label] + [repr(y) for y in ys]) + "\n")
+
+    def put(self, row0, data):
+        self.waiting[row0] = data
+        cols = len(self.ys)
+        while self.next_row in self.waiting:
+            vals = array("d")
+            vals.frombytes(self.waiting.pop(self.next_row))
+            r0 = self.next_row
+            n = len(vals) // cols
+            lines = []
+            for r in range(n):
+                row = vals[r * cols:(r + 1) * cols]
+                lines.append(",".join([repr(self.xs[r0 + r])] +
+                                      ["" if v != v else repr(v) for v in row]))
+            self.f.write("\n".join(lines) + "\n")
+            self.next_row += n
+
+    def close(self):
+        self.f.close()
+
+
+class _NPYSink:
+    def __init__(self, path, xs, ys, label):
+        self.cols = len(ys)
+        head = _npy_header(len(xs), len(ys))
+        self.base = len(head)
+        self.f = open(path, "wb")
+        self.f.write(head)
+        self.f.truncate(self.base + 8 * len(xs) * len(ys))
+
+    def put(self, row0, data):
+        self.f.seek(self.base + 8 * row0 * self.cols)
+        self.f.write(data)
+
+    def close(self):
+        self.f.close()
+
+
+def run_sweep(kind, xs, ys, path, text=None, angle_mode="DEG", workers=None,
+              block_cells=65536, progress=None, cancel=None):
+    """Evaluate the table and write it to *path* (``.npy`` or CSV).
+
+    *progress(done_rows, total_rows)* is called from this thread after each
+    block; *cancel()* returning True stops the sweep early.  Returns the
+    number of rows written.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown sweep kind {kind!r}")
+    if kind == "expr":
+        text = _xy_text(text or "")
+        # Raise syntax errors, and errors of constants such as 0/0, here.
+        compile_expr(text, angle_mode)
+    ys = list(ys) if ys else [0.0]
+    xs = list(xs)
+    rows_per = max(1, block_cells // len(ys))
+    sink = (_NPYSink if path.endswith(".npy") else _CSVSink)(
+        path, xs, ys, {"bmi": "kg\\cm", "discount": "price\\%"}.get(kind, "x\\y"))
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    try:
+        with cf.ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+            pending = {pool.submit(_block, kind, text, angle_mode,
+                                   xs[r:r + rows_per], ys): r
+                       for r in range(0, len(xs), rows_per)}
+            while pending:
+                finished, _ = cf.wait(pending, timeout=0.1,
+                                      return_when=cf.FIRST_COMPLETED)
+                if cancel is not None and cancel():
+                    for fut in pending: fut.cancel()
+                    break
+                for fut in finished:
+                    r = pending.pop(fut)
+                    data = fut.result()
+                    sink.put(r, data)
+                    done += len(data) // (8 * len(ys))
+                    if progress is not None:
+                        progress(done, len(xs))
+    finally:
+        sink.close()
+    return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="calc_sweep",
+                                 description="Write a parameter-sweep table.")
+    ap.add_argument("kind", choices=KINDS)
+    ap.add_argument("expr", nargs="?", help="expression in x and y (kind expr)")
+    ap.add_argument("--x", required=True, help="start:stop:count or a,b,c")
+    ap.add_argument("--y", help="start:stop:count or a,b,c")
+    ap.add_argument("-o", "--output", required=True, help=".csv or .npy file")
+    ap.add_argument("--angle", default="DEG", choices=("DEG", "RAD", "GRAD"))
+    ap.add_argument("-j", "--workers", type=int, help="processes (default: all cores)")
+    args = ap.parse_args(argv)
+    if args.kind == "expr" and not args.expr:
+        ap.error("kind expr needs an expression")
+    if args.kind != "expr" and not args.y:
+        ap.error(f"kind {args.kind} needs --y")
+    try:
+        xs = grid(args.x)
+        ys = grid(args.y) if args.y else None
+    except ValueError as ex:
+        ap.error(f"bad grid: {ex}")
+
+    t0 = time.perf_counter()
+    try:
+        rows = run_sweep(args.kind, xs, ys, args.output, args.expr, args.angle,
+                         args.workers)
+    except (SyntaxError, ArithmeticError, ValueError, OSError, cf.BrokenExecutor) as ex:
+        print(f"calc_sweep: {str(ex) or type(ex).__name__}", file=sys.stderr)
+        return 1
+    dt = time.perf_counter() - t0
+    cells = rows * (len(ys) if ys else 1)
+    print(f"{cells} cells in {dt:.3f}s ({cells / dt if dt else 0:,.0f} cells/sec)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
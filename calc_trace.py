@@ -0,0 +1,349 @@
+"""Keystroke traces: record scientific-keypad sessions and replay them.
+
+A Keypad with a TraceWriter as its ``recorder`` logs every input: the keys
+given to ``press`` (cursor and undo keys included), the angle / 2nd / exact
+toggles, pastes, history recalls and failed out-of-process evaluations.
+The GUI starts and stops a recording with Ctrl+Alt+R (files go to
+TRACE_DIR).  Replaying needs no display and runs as fast as the keypad
+allows::
+
+    python calc_trace.py replay session.ctr                 # check + timing
+    python calc_trace.py replay session.ctr --preview --repeat 20
+    python calc_trace.py dump session.ctr
+    python calc_trace.py script "12+34×5=" "sin 30 = @angle" -o corpus.ctr
+
+File layout::
+
+    b"CALCTRC1"
+    varint n, n × string              key table; events are indices into it
+    string angle mode, byte flags     bit 0: 2nd, bit 1: exact
+    string expr, display, expr_text, mem_text, memory, last result
+    events: varint id, its string arguments, uint16 check (little endian)
+
+Strings are a varint byte length plus UTF-8.  Keys missing from the table
+are written as ``@key`` with the key as argument.  The check is the low 16
+bits of a CRC-32 of the keypad state after the event (expression, its
+display, memory and last result; not the live preview, which the GUI
+computes on idle), so a replay can tell after every step whether it still
+matches the recording.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from collections import namedtuple
+from fractions import Fraction
+
+from calc_core import Keypad, INV_MAP, EDIT_KEYS, fmt, int_to_str
+from calc_history import Entry
+
+MAGIC = b"CALCTRC1"
+TRACE_DIR = os.path.join(os.path.expanduser("~"), ".smartcalc", "traces")
+
+# Events that carry string arguments, and how many.
+EVENT_ARGS = {"@feed": 1, "@recall": 2, "@fail": 1, "@key": 1}
+
+KEY_TABLE = (tuple("0123456789") + ("00", ".", "+", "−", "×", "÷", "-", "*", "/",
+             "(", ")", "=", "C", "⌫", "±", "%", "MC", "MR", "M+", "M−", "MS",
+             "sin", "cos", "tan", "x!", "π", "log", "ln", "√", "x²", "e",
+             "xʸ", "1/x", "∛", "EXP", "Ans")
+             + tuple(v for v in INV_MAP.values() if v not in ("√", "x²"))
+             + tuple(sorted(EDIT_KEYS))
+             + ("@angle", "@inv", "@exact") + tuple(EVENT_ARGS))
+
+Start = namedtuple("Start", "angle_mode inv_mode exact expr display expr_text "
+                            "mem_text memory last_result")
+Event = namedtuple("Event", "key args check")
+Trace = namedtuple("Trace", "keys start events")
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_str(out, s):
+    b = s.encode("utf-8")
+    _put_varint(out, len(b))
+    out += b
+
+
+def _get_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _get_str(data, pos):
+    n, pos = _get_varint(data, pos)
+    if pos + n > len(data):
+        raise IndexError("truncated string")
+    return data[pos:pos + n].decode("utf-8"), pos + n
+
+
+def _value_text(v):
+    if v is None: return ""
+    if isinstance(v, Fraction): return f"{int_to_str(v.numerator)}/{int_to_str(v.denominator)}"
+    if isinstance(v, int): return int_to_str(v)
+    if isinstance(v, float): return repr(v)
+    return ""                       # a Magnitude cannot be restored
+
+
+def _parse_value(text):
+    if not text: return None
+    if "/" in text: return Fraction(text)
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def state_check(pad):
+    """16-bit digest of the keypad state compared after every step."""
+    last = "" if pad.last_result is None else fmt(pad.last_result)
+    s = "\0".join((pad.expr, pad.expr_text, pad.mem_text, last))
+    return zlib.crc32(s.encode("utf-8", "surrogatepass")) & 0xFFFF
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  RECORDING
+# ════════════════════════════════════════════════════════════════════════════
+
+class TraceWriter:
+    """Keypad recorder writing a trace file; attach as ``pad.recorder``."""
+
+    def __init__(self, path, pad, keys=KEY_TABLE):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path  = path
+        self.pad   = pad
+        self.ids   = {k: i for i, k in enumerate(keys)}
+        self.steps = 0
+        out = bytearray(MAGIC)
+        _put_varint(out, len(keys))
+        for k in keys:
+            _put_str(out, k)
+        _put_str(out, pad.angle_mode)
+        out.append(pad.inv_mode | pad.exact << 1)
+        for s in (pad.expr, pad.display_str, pad.expr_text, pad.mem_text,
+                  _value_text(pad.memory), _value_text(pad.last_result)):
+            _put_str(out, s)
+        self._f = open(path, "wb")
+        self._f.write(out)
+
+    def record(self, event, *args):
+        i = self.ids.get(event)
+        if i is None:
+            i, args = self.ids["@key"], (event,)
+        out = bytearray()
+        _put_varint(out, i)
+        for a in args:
+            _put_str(out, a)
+        out += state_check(self.pad).to_bytes(2, "little")
+        self._f.write(out)
+        self.steps += 1
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def new_trace_path():
+    return os.path.join(TRACE_DIR, time.strftime("%Y%m%d-%H%M%S") + ".ctr")
+
+
+def read_trace(path):
+    """Load a trace; a torn last event (e.g. after a crash) is dropped."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path}: not a calculator trace")
+    pos = len(MAGIC)
+    try:
+        n, pos = _get_varint(data, pos)
+        keys = []
+        for _ in range(n):
+            k, pos = _get_str(data, pos)
+            keys.append(k)
+        mode, pos = _get_str(data, pos)
+        flags = data[pos]; pos += 1
+        fields = []
+        for _ in range(6):
+            s, pos = _get_str(data, pos)
+            fields.append(s)
+    except (IndexError, UnicodeDecodeError):
+        raise ValueError(f"{path}: truncated trace header") from None
+    start = Start(mode, bool(flags & 1), bool(flags & 2), *fields[:4],
+                  _parse_value(fields[4]) or 0, _parse_value(fields[5]))
+    events = []
+    while pos < len(data):
+        try:
+            i, p = _get_varint(data, pos)
+            key, args = keys[i], []
+            for _ in range(EVENT_ARGS.get(key, 0)):
+                a, p = _get_str(data, p)
+                args.append(a)
+            if p + 2 > len(data): break
+            check = int.from_bytes(data[p:p + 2], "little")
+        except (IndexError, UnicodeDecodeError):
+            break
+        if key == "@key": key, args = args[0], []
+        events.append(Event(key, tuple(args), check))
+        pos = p + 2
+    return Trace(keys, start, events)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+#  REPLAY
+# ════════════════════════════════════════════════════════════════════════════
+
+def start_pad(start):
+    """A fresh Keypad in the state a recording started from."""
+    pad = Keypad()
+    pad.angle_mode, pad.inv_mode, pad.exact = start.angle_mode, start.inv_mode, start.exact
+    if start.expr:
+        pad.recall(Entry(-1, 0.0, start.expr, start.display, ""))
+    pad.expr_text, pad.mem_text = start.expr_text, start.mem_text
+    pad.memory, pad.last_result = start.memory, start.last_result
+    return pad
+
+
+def apply(pad, key, args=()):
+    """Feed one recorded event to *pad*."""
+    if   key == "@angle":  pad.toggle_angle()
+    elif key == "@inv":    pad.toggle_inv()
+    elif key == "@exact":  pad.toggle_exact()
+    elif key == "@feed":   pad.feed(args[0])
+    elif key == "@recall": pad.recall(Entry(-1, 0.0, args[0], args[1], ""))
+    elif key == "@fail":   pad.fail(args[0])
+    else:                  pad.press(key)
+
+
+def _pct(sorted_ns, q):
+    return sorted_ns[min(len(sorted_ns) - 1, int(q * len(sorted_ns)))] / 1e3
+
+
+def replay(trace, check=True, preview=False, repeat=1):
+    """Replay *trace* (a Trace or a path) on fresh keypads.
+
+    With *preview* the live preview runs after every step that wants one, as
+    the GUI would on idle.  Returns timing percentiles in µs, per-key means
+    and the steps whose state check failed (first 20).
+    """
+    if isinstance(trace, str):
+        trace = read_trace(trace)
+    times, per_key, bad, nbad = [], {}, [], 0
+    clock = time.perf_counter_ns
+    t_start = clock()
+    for _ in range(repeat):
+        pad = start_pad(trace.start)
+        for n, (key, args, crc) in enumerate(trace.events):
+            t0 = clock()
+            apply(pad, key, args)
+            if preview and pad.preview_due:
+                pad.preview()
+            dt = clock() - t0
+            times.append(dt)
+            k = per_key.get(key)
+            if k is None: per_key[key] = [1, dt]
+            else:         k[0] += 1; k[1] += dt
+            if check and state_check(pad) != crc:
+                nbad += 1
+                if len(bad) < 20: bad.append({"step": n, "key": key, "expr": pad.display_str})
+    wall = (clock() - t_start) / 1e9
+    times.sort()
+    steps = len(times)
+    return {"steps": steps, "seconds": wall,
+            "steps_per_sec": steps / wall if wall else 0.0,
+            "p50_us": _pct(times, 0.50) if times else 0.0,
+            "p90_us": _pct(times, 0.90) if times else 0.0,
+            "p99_us": _pct(times, 0.99) if times else 0.0,
+            "max_us": times[-1] / 1e3 if times else 0.0,
+            "keys": {k: {"n": c, "mean_us": t / c / 1e3}
+                     for k, (c, t) in sorted(per_key.items(), key=lambda kv: -kv[1][1])},
+            "mismatches": nbad, "first_mismatches": bad}
+
+
+# Key names of a script, longest first so "sin⁻¹" wins over "sin"; digits
+# are single keys ("100" is 1 0 0) and spaces only separate.
+_SCRIPT_KEY = re.compile("|".join(
+    [re.escape(k) for k in sorted(KEY_TABLE, key=len, reverse=True)
+     if k not in EVENT_ARGS and k != "00" and not k.isdigit()]
+    + ["[0-9]", r"(\S)"]))
+
+
+def _script_keys(script):
+    """Keys of a script such as ``"12+34×5="`` or ``"sin 30 = @angle"``."""
+    out = []
+    for m in _SCRIPT_KEY.finditer(script):
+        if m.group(1):
+            raise ValueError(f"unknown key {m.group(1)!r} in {script!r}")
+        out.append(m.group())
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="calc_trace",
+                                 description="Record and replay keypad traces.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("replay", help="replay with per-step checks and timing")
+    r.add_argument("trace")
+    r.add_argument("--preview", action="store_true", help="run the live preview too")
+    r.add_argument("--repeat", type=int, default=1)
+    r.add_argument("--no-check", action="store_true")
+    r.add_argument("-o", "--output", help="write the results as JSON")
+    d = sub.add_parser("dump", help="list the events of a trace")
+    d.add_argument("trace")
+    s = sub.add_parser("script", help="write a trace from key scripts")
+    s.add_argument("scripts", nargs="+", help='space-separated keys, e.g. "sin 30 ="')
+    s.add_argument("-o", "--output", required=True)
+    args = ap.parse_args(argv)
+
+    try:
+        if args.cmd == "script":
+            pad = Keypad()
+            pad.recorder = w = TraceWriter(args.output, pad)
+            for script in args.scripts:
+                for key in _script_keys(script):
+                    apply(pad, key)
+            w.close()
+            print(f"{w.steps} events written to {args.output}", file=sys.stderr)
+            return 0
+        trace = read_trace(args.trace)
+    except (OSError, ValueError) as ex:
+        print(f"calc_trace: {ex}", file=sys.stderr)
+        return 1
+
+    if args.cmd == "dump":
+        print(f"start: {trace.start.angle_mode}"
+              f"{' 2nd' if trace.start.inv_mode else ''}"
+              f"{' exact' if trace.start.exact else ''}  {trace.start.display!r}")
+        for n, (key, a, crc) in enumerate(trace.events):
+            print(f"{n:6d}  {key:8s} {' '.join(map(repr, a))}  [{crc:04x}]")
+        return 0
+
+    res = replay(trace, check=not args.no_check, preview=args.preview,
+                 repeat=args.repeat)
+    text = json.dumps(res, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if res["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
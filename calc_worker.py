@@ -0,0 +1,151 @@
+"""Out-of-process expression evaluation.
+
+EvalWorker evaluates calc_core expressions in a reusable child process so a
+runaway evaluation costs one killed worker instead of a frozen caller.  Each
+evaluation gets a CPU-time budget (RLIMIT_CPU) and the worker an address
+space cap (RLIMIT_AS) where the platform supports them; a wall-clock
+deadline in the parent backs both up.  Submitting a new job supersedes the
+previous one, and a superseded job that is still running after
+``cancel_after`` seconds is killed rather than waited for.
+
+The API is non-blocking: ``submit()`` returns at once and ``poll()`` is
+called from a timer (the GUI uses ``after()``) until the result arrives.
+"""
+import multiprocessing as mp
+import time
+
+try:
+    import resource
+except ImportError:                     # Windows
+    resource = None
+
+from calc_core import evaluate
+
+
+def _serve(conn, cpu_seconds, mem_bytes):
+    if resource is not None and mem_bytes:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+        except (ValueError, OSError):
+            pass
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        job, text, angle_mode, exact, ans = msg
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the whole process, so move it forward by the
+            # budget before every job.
+            ru = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(ru.ru_utime + ru.ru_stime + cpu_seconds) + 1
+            hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            try:
+                resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+            except (ValueError, OSError):
+                pass
+        try:
+            res = (job, True, evaluate(text, angle_mode, exact=exact, ans=ans))
+        except MemoryError:
+            res = (job, False, "Out of memory")
+        except OverflowError:
+            res = (job, False, "Result too large")
+        except Exception:
+            res = (job, False, "Syntax Error")
+        conn.send(res)
+
+
+class EvalWorker:
+    """A single reusable evaluation process with timeout and cancellation."""
+
+    def __init__(self, timeout=2.0, mem_limit=1 << 30, cancel_after=0.05):
+        self.timeout = timeout
+        self.mem_limit = mem_limit
+        self.cancel_after = cancel_after
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self._job = 0           # id of the latest submitted job
+        self._pending = None    # latest job not yet handed to the worker
+        self._running = None    # (job id, start time) of the job in flight
+
+    @property
+    def busy(self):
+        return self._running is not None or self._pending is not None
+
+    def submit(self, text, angle_mode="DEG", exact=False, ans=0):
+        """Queue an evaluation, superseding any earlier one; returns its id."""
+        self._job += 1
+        self._pending = (self._job, text, angle_mode, exact, ans)
+        if (self._running is not None and
+                time.monotonic() - self._running[1] > self.cancel_after):
+            self._kill()
+        self._dispatch()
+        return self._job
+
+    def poll(self):
+        """Return ``(job, ok, value_or_message)`` for the latest job, or None.
+
+        Results of superseded jobs are dropped.  A worker that dies or runs
+        past its deadline is killed and reported as a timeout.
+        """
+        if self._running is None:
+            self._dispatch()
+            return None
+        job, started = self._running
+        try:
+            ready = self._conn.poll()
+        except (OSError, EOFError):
+            ready = True
+        if ready:
+            try:
+                res = self._conn.recv()
+                self._running = None
+            except (OSError, EOFError):
+                self._kill()
+                res = (job, False, "Timeout")
+        elif time.monotonic() - started > self.timeout * 2 + 0.5:
+            self._kill()
+            res = (job, False, "Timeout")
+        else:
+            return None
+        self._dispatch()
+        return res if res[0] == self._job else None
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self._kill()
+
+    def _start(self):
+        parent, child = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=_serve, args=(child, self.timeout, self.mem_limit), daemon=True)
+        self._proc.start()
+        child.close()
+        self._conn = parent
+
+    def _kill(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join()
+            self._conn.close()
+        self._proc = self._conn = None
+        self._running = None
+
+    def _dispatch(self):
+        if self._running is not None or self._pending is None:
+            return
+        if self._proc is None or not self._proc.is_alive():
+            self._kill()
+            self._start()
+        self._conn.send(self._pending)
+        self._running = (self._pending[0], time.monotonic())
+        self._pending = None
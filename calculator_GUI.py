@@ -1,7 +1,21 @@
-import tkinter as tk
-from tkinter import ttk
 import math
-from datetime import datetime, date
+import sys
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog
+from collections import OrderedDict
+
+from calc_core import (Keypad, INV_MAP, EVAL_KEYS, UNITS, TEMPERATURE_UNITS,
+                       NUMERAL_BASES, convert_unit, convert_temperature,
+                       convert_numeral, convert_numeral_file, parse_date,
+                       date_breakdown, age, bmi, discount, PlotSampler,
+                       evaluate, fmt, find_roots, find_extrema, integrate)
+from calc_worker import EvalWorker
+from calc_history import HistoryTape, DEFAULT_PATH as HISTORY_PATH
+import calc_profile
+import calc_sweep
+import calc_trace
+from calc_profile import instrument, instrument_methods
 
 
 BG           = "#0d0d0d"
@@ -39,6 +53,28 @@ FONT_RESULT  = ("Courier New", 16, "bold")
 FONT_CARD    = ("Courier New", 10, "bold")
 
 
+# ttk styles used by the pages.  They are baked into one named theme derived
+# from "clam" the first time a window needs it, so creating a styled widget
+# never triggers a theme switch (which restyles every live ttk widget).
+THEME = "smartcalc-dark"
+TTK_STYLES = {
+    "Dark.TCombobox": {"configure": dict(
+        fieldbackground=DISPLAY_BG, background=DISPLAY_BG,
+        foreground=TEXT_MAIN, arrowcolor=TEXT_ACCENT,
+        selectbackground=DISPLAY_BG, selectforeground=TEXT_MAIN)},
+}
+
+
+def use_theme(root):
+    """Create (once per Tk interpreter) and activate the dark ttk theme."""
+    style = ttk.Style(root)
+    if THEME not in style.theme_names():
+        style.theme_create(THEME, parent="clam", settings=TTK_STYLES)
+    if style.theme_use() != THEME:
+        style.theme_use(THEME)
+    return style
+
+
 class HBtn(tk.Button):
     def __init__(self, master, bg_n, bg_h, **kw):
         super().__init__(master, bg=bg_n, activebackground=bg_h,
@@ -53,16 +89,136 @@ class HBtn(tk.Button):
         self.config(bg=col)
 
 
+class RenderQueue:
+    """Collects display updates and applies them once per frame.
+
+    ``set()`` only records the latest value per variable; ``flush()`` runs
+    from a single ``after()`` callback and skips values already shown, so a
+    burst of keystrokes costs one redraw of each changed label.
+    """
+
+    FRAME_MS = 16
+
+    def __init__(self, widget):
+        self._widget = widget
+        self._dirty  = {}       # var name -> (var, value)
+        self._shown  = {}       # var name -> value last written
+        self._job    = None
+
+    def set(self, var, value):
+        self._dirty[str(var)] = (var, value)
+        if self._job is None:
+            self._job = self._widget.after(self.FRAME_MS, self.flush)
+
+    def flush(self):
+        self._job = None
+        dirty, self._dirty = self._dirty, {}
+        for name, (var, value) in dirty.items():
+            if self._shown.get(name) != value:
+                var.set(value)
+                self._shown[name] = value
+
+
+class CanvasKeypad(tk.Canvas):
+    """A grid of keys drawn as tagged items on a single canvas.
+
+    ``keys`` holds ``(label, row, col, colspan, bg, hover_bg, fg)`` tuples.
+    One set of bindings hit-tests by grid arithmetic and calls
+    ``command(label)`` on release, like a button; hover and relabeling are
+    ``itemconfig`` calls instead of widget reconfigurations.
+    """
+
+    PADX, PADY = 3, 2           # same gaps as the old grid(padx=3, pady=2)
+
+    def __init__(self, master, keys, rows, cols, command):
+        super().__init__(master, bg=BG, highlightthickness=0, bd=0, cursor="hand2")
+        self.command = command
+        self.rows, self.cols = rows, cols
+        self.keys  = []         # [label, row, col, span, bg, hover_bg, rect, text]
+        self._cell = {}         # (row, col) -> index into keys
+        self._cw = self._ch = 1.0
+        self._hot = self._down = None
+        for i, (label, r, c, span, bg, hov, fg) in enumerate(keys):
+            rect = self.create_rectangle(0, 0, 0, 0, fill=bg, width=0,
+                                         tags=("key", f"k{i}"))
+            text = self.create_text(0, 0, text=label, fill=fg, font=self._font(label),
+                                    tags=("label", f"k{i}"))
+            self.keys.append([label, r, c, span, bg, hov, rect, text])
+            for cc in range(c, c + span):
+                self._cell[r, cc] = i
+        self.bind("<Configure>",       self._layout)
+        self.bind("<Motion>",          lambda e: self._hover(self._hit(e)))
+        self.bind("<Leave>",           lambda e: self._hover(None))
+        self.bind("<ButtonPress-1>",   self._on_press)
+        self.bind("<ButtonRelease-1>", self._on_release)
+
+    @staticmethod
+    def _font(label):
+        return FONT_BTN if len(label) <= 3 else FONT_BTN_SM
+
+    def _layout(self, e):
+        self._cw, self._ch = e.width / self.cols, e.height / self.rows
+        cw, ch, px, py = self._cw, self._ch, self.PADX, self.PADY
+        for label, r, c, span, bg, hov, rect, text in self.keys:
+            x0, y0 = c * cw + px, r * ch + py
+            x1, y1 = (c + span) * cw - px, (r + 1) * ch - py
+            self.coords(rect, x0, y0, x1, y1)
+            self.coords(text, (x0 + x1) / 2, (y0 + y1) / 2)
+
+    def _hit(self, e):
+        r, c = int(e.y // self._ch), int(e.x // self._cw)
+        i = self._cell.get((r, c))
+        if i is None: return None
+        span = self.keys[i][3]
+        c0 = self.keys[i][2]
+        inside = (c0 * self._cw + self.PADX <= e.x <= (c0 + span) * self._cw - self.PADX
+                  and r * self._ch + self.PADY <= e.y <= (r + 1) * self._ch - self.PADY)
+        return i if inside else None
+
+    def _hover(self, i):
+        if i == self._hot: return
+        if self._hot is not None:
+            k = self.keys[self._hot]
+            self.itemconfig(k[6], fill=k[4])
+        if i is not None:
+            self.itemconfig(self.keys[i][6], fill=self.keys[i][5])
+        self._hot = i
+
+    def _on_press(self, e):
+        self._down = self._hit(e)
+
+    def _on_release(self, e):
+        i, self._down = self._down, None
+        if i is not None and i == self._hit(e):
+            self.command(self.keys[i][0])
+
+    def relabel(self, mapping):
+        """Rename every key whose label is in *mapping* (all at once)."""
+        for k in self.keys:
+            new = mapping.get(k[0])
+            if new is not None:
+                k[0] = new
+                self.itemconfig(k[7], text=new, font=self._font(new))
+
+
 # ════════════════════════════════════════════════════════════════════════════
 #  MAIN APP SHELL
 # ════════════════════════════════════════════════════════════════════════════
 class App(tk.Tk):
-    def __init__(self):
+    """Main window.
+
+    Pages are built on first ``show()``.  With *max_hidden* set, at most that
+    many hidden pages are kept alive; the least recently shown evictable page
+    is destroyed and rebuilt the next time it is shown.
+    """
+
+    def __init__(self, max_hidden=None):
         super().__init__()
         self.title("Smart Calculator")
         self.geometry("400x600")
         self.resizable(False, False)
         self.configure(bg=BG)
+        self.style = use_theme(self)
 
         self._build_nav()
 
@@ -73,16 +229,38 @@ class App(tk.Tk):
         self.container.grid_columnconfigure(0, weight=1)
 
         
-        self.pages = {}
-        for P in (ScientificPage, HomePage,
-                  BMIPage, AgePage, DiscountPage, TemperaturePage,
-                  SpeedPage, LengthPage, MassPage, AreaPage,
-                  VolumePage, DataPage, TimePage, DatePage, NumeralPage):
-            p = P(self.container, self)
-            self.pages[P] = p
-            p.grid(row=0, column=0, sticky="nsew")
+        self.pages = OrderedDict()          # least recently shown first
+        self.max_hidden = max_hidden
 
         self.show(ScientificPage)
+        # hidden: start/stop a cProfile session (see calc_profile)
+        self.bind_all("<Control-Alt-p>", self._toggle_profiler)
+        # hidden: start/stop recording a keystroke trace (see calc_trace)
+        self.bind_all("<Control-Alt-r>", self._toggle_trace)
+
+    def _toggle_profiler(self, _event=None):
+        path = calc_profile.toggle_cprofile()
+        if path is None:
+            self.title("Smart Calculator  [profiling]")
+        else:
+            self.title("Smart Calculator")
+            print(f"profile written to {path}", file=sys.stderr)
+
+    def _toggle_trace(self, _event=None):
+        page = self.pages.get(ScientificPage)
+        if page is None: return
+        pad = page.pad
+        if pad.recorder is None:
+            try:
+                pad.recorder = calc_trace.TraceWriter(calc_trace.new_trace_path(), pad)
+            except OSError as ex:
+                print(f"cannot record trace: {ex}", file=sys.stderr); return
+            self.title("Smart Calculator  [recording]")
+        else:
+            rec, pad.recorder = pad.recorder, None
+            rec.close()
+            self.title("Smart Calculator")
+            print(f"trace written to {rec.path} ({rec.steps} events)", file=sys.stderr)
 
    
     def _build_nav(self):
@@ -94,6 +272,7 @@ class App(tk.Tk):
         items = [
             ("⊞", "Converters", HomePage),
             ("∫", "Scientific",  ScientificPage),
+            ("ƒ", "Solver",      SolverPage),
         ]
         for icon, label, page in items:
             col = tk.Frame(nav, bg="#0a0a0a")
@@ -109,8 +288,30 @@ class App(tk.Tk):
         
         tk.Frame(self, bg="#222224", height=1).pack(side="bottom", fill="x")
 
+    def _page(self, page_cls):
+        page = self.pages.get(page_cls)
+        if page is None:
+            page = page_cls(self.container, self)
+            page.grid(row=0, column=0, sticky="nsew")
+            self.pages[page_cls] = page
+        else:
+            self.pages.move_to_end(page_cls)
+        return page
+
+    def _evict(self):
+        if self.max_hidden is None: return
+        excess = len(self.pages) - 1 - self.max_hidden
+        if excess <= 0: return
+        shown  = next(reversed(self.pages))
+        victims = [P for P, p in self.pages.items()
+                   if P is not shown and p.EVICTABLE][:excess]
+        for P in victims:
+            self.pages.pop(P).destroy()
+
+    @instrument()
     def show(self, page_cls):
-        self.pages[page_cls].tkraise()
+        self._page(page_cls).tkraise()
+        self._evict()
         
         for p, btn in self._nav_btns.items():
             is_active = (p == page_cls or
@@ -120,6 +321,8 @@ class App(tk.Tk):
 
 #Converter grid
 class HomePage(tk.Frame):
+    EVICTABLE = False
+
     def __init__(self, parent, controller):
         super().__init__(parent, bg=BG)
         self.controller = controller
@@ -127,13 +330,17 @@ class HomePage(tk.Frame):
         self.MODES = [
             ("🎂", "Age", AgePage),
             ("📐", "Area", AreaPage),
+            ("📶", "Bandwidth", BandwidthPage),
             ("⚖", "BMI", BMIPage),
             ("📅", "Date", DatePage),
             ("🏷", "Discount", DiscountPage),
+            ("⛽", "Fuel", FuelPage),
             ("📏", "Length", LengthPage),
             ("🏋", "Mass", MassPage),
             ("🔢", "Numeral", NumeralPage),
+            ("📈", "Plot", PlotPage),
             ("🚀", "Speed", SpeedPage),
+            ("🧮", "Sweep", SweepPage),
             ("🌡", "Temperature", TemperaturePage),
             ("⏱", "Time", TimePage),
             ("🧪", "Volume", VolumePage),
@@ -200,16 +407,24 @@ class HomePage(tk.Frame):
 
 #Scientific calculator
 class ScientificPage(tk.Frame):
+    EVICTABLE = False
+    INV_BACK  = {v: k for k, v in INV_MAP.items()}
+
     def __init__(self, parent, controller):
         super().__init__(parent, bg=BG)
         self.controller = controller
 
-        self.expr        = ""
-        self.display_str = ""
-        self.memory      = 0.0
-        self.last_result = None
-        self.angle_mode  = "DEG"
-        self.inv_mode    = False
+        self.pad       = Keypad()
+        self._live_job = None
+        self._worker   = None     # EvalWorker, started on first exact evaluation
+        self._request  = None
+        self._deferred = None
+        self._poll_job = None
+        self._render   = RenderQueue(self)
+        try:
+            self.pad.history = HistoryTape(HISTORY_PATH)
+        except OSError:
+            pass                  # no writable home: run without a tape
 
         self._build()
         self._bind_keys()
@@ -232,6 +447,15 @@ class ScientificPage(tk.Frame):
                             command=self._toggle_inv, padx=8, pady=4)
         self.inv_btn.pack(side="right", padx=2, pady=12)
 
+        self.exact_btn = HBtn(hdr, BTN_SCI, HOVER_SCI, text="FLT",
+                              fg=TEXT_SCI, font=FONT_BTN_SM,
+                              command=self._toggle_exact, padx=8, pady=4)
+        self.exact_btn.pack(side="right", padx=2, pady=12)
+
+        HBtn(hdr, BTN_SCI, HOVER_SCI, text="HIST",
+             fg=TEXT_SCI, font=FONT_BTN_SM,
+             command=self._show_history, padx=8, pady=4).pack(side="right", padx=2, pady=12)
+
     
         disp = tk.Frame(self, bg=DISPLAY_BG, height=95)
         disp.pack(fill="x", padx=10, pady=(6, 2))
@@ -248,19 +472,16 @@ class ScientificPage(tk.Frame):
         tk.Label(top_row, textvariable=self.expr_var,
                  bg=DISPLAY_BG, fg=TEXT_SUB, font=FONT_EXPR, anchor="e").pack(side="right")
 
-        tk.Label(disp, textvariable=self.result_var,
-                 bg=DISPLAY_BG, fg=TEXT_MAIN, font=FONT_DISPLAY,
-                 anchor="e").pack(fill="x", padx=10, pady=(2, 8))
+        result_lbl = tk.Label(disp, textvariable=self.result_var,
+                              bg=DISPLAY_BG, fg=TEXT_MAIN, font=FONT_DISPLAY,
+                              anchor="e")
+        result_lbl.pack(fill="x", padx=10, pady=(2, 8))
+        result_lbl.bind("<Button-1>", self._show_full)
 
         
-        bf = tk.Frame(self, bg=BG)
-        bf.pack(fill="both", expand=True, padx=8, pady=4)
-
         N, O, S, A, M, C = BTN_NUM, BTN_OP, BTN_SCI, BTN_ACCENT, BTN_MEM, BTN_CLEAR
         HN, HO, HS, HA, HM = HOVER_NUM, HOVER_OP, HOVER_SCI, HOVER_ACCENT, HOVER_MEM
 
-        self.sci_btns = {}
-
         rows = [
             [("MC",M,HM,TEXT_MEM),("MR",M,HM,TEXT_MEM),("M+",M,HM,TEXT_MEM),
              ("M−",M,HM,TEXT_MEM),("MS",M,HM,TEXT_MEM)],
@@ -280,30 +501,12 @@ class ScientificPage(tk.Frame):
              ("+",A,HA,TEXT_MAIN),(".",O,HO,TEXT_MAIN)],
         ]
 
-        for r, row in enumerate(rows):
-            for c, (lbl, bg, hov, fg) in enumerate(row):
-                b = HBtn(bf, bg, hov, text=lbl, fg=fg,
-                         font=FONT_BTN if len(lbl) <= 3 else FONT_BTN_SM,
-                         command=lambda l=lbl: self._press(l))
-                b.grid(row=r, column=c, padx=3, pady=2, sticky="nsew")
-                if bg == S:
-                    self.sci_btns[lbl] = b
-
-        
-        HBtn(bf, N, HN, text="0", fg=TEXT_MAIN, font=FONT_BTN,
-             command=lambda: self._press("0")).grid(
-            row=8, column=0, columnspan=2, padx=3, pady=2, sticky="nsew")
-        HBtn(bf, N, HN, text="00", fg=TEXT_MAIN, font=FONT_BTN,
-             command=lambda: self._press("00")).grid(
-            row=8, column=2, padx=3, pady=2, sticky="nsew")
-        HBtn(bf, A, HA, text="=", fg=TEXT_MAIN, font=FONT_BTN,
-             command=lambda: self._press("=")).grid(
-            row=8, column=3, columnspan=2, padx=3, pady=2, sticky="nsew")
-
-        for c in range(5):
-            bf.columnconfigure(c, weight=1)
-        for r in range(9):
-            bf.rowconfigure(r, weight=1)
+        keys = [(lbl, r, c, 1, bg, hov, fg)
+                for r, row in enumerate(rows) for c, (lbl, bg, hov, fg) in enumerate(row)]
+        keys += [("0", 8, 0, 2, N, HN, TEXT_MAIN), ("00", 8, 2, 1, N, HN, TEXT_MAIN),
+                 ("=", 8, 3, 2, A, HA, TEXT_MAIN)]
+        self.keypad = CanvasKeypad(self, keys, 9, 5, self._press)
+        self.keypad.pack(fill="both", expand=True, padx=5, pady=4)
 
     def _bind_keys(self):
         for k in "0123456789.+-*/()":
@@ -311,182 +514,183 @@ class ScientificPage(tk.Frame):
         self.bind("<Return>",    lambda e: self._press("="))
         self.bind("<BackSpace>", lambda e: self._press("⌫"))
         self.bind("<Escape>",    lambda e: self._press("C"))
-
-    def _toggle_angle(self):
-        modes = ["DEG", "RAD", "GRAD"]
-        self.angle_mode = modes[(modes.index(self.angle_mode) + 1) % 3]
-        self.angle_btn.config(text=self.angle_mode)
-
-    def _toggle_inv(self):
-        self.inv_mode = not self.inv_mode
-        self.inv_btn.config(bg=BTN_ACCENT if self.inv_mode else BTN_SCI,
-                            fg=TEXT_MAIN  if self.inv_mode else TEXT_SCI)
-        inv_map = {"sin":"sin⁻¹","cos":"cos⁻¹","tan":"tan⁻¹",
-                   "log":"10ˣ","ln":"eˣ","√":"x²","x²":"√","∛":"x³","xʸ":"ʸ√x"}
-        fwd = inv_map if self.inv_mode else {v: k for k, v in inv_map.items()}
-        for old, btn in list(self.sci_btns.items()):
-            if old in fwd:
-                new = fwd[old]
-                btn.config(text=new, command=lambda l=new: self._press(l))
-                self.sci_btns[new] = btn
-                del self.sci_btns[old]
-
-    def _to_rad(self, x):
-        if self.angle_mode == "DEG":  return math.radians(x)
-        if self.angle_mode == "GRAD": return x * math.pi / 200
-        return x
-
-    def _from_rad(self, x):
-        if self.angle_mode == "DEG":  return math.degrees(x)
-        if self.angle_mode == "GRAD": return x * 200 / math.pi
-        return x
-
-    def _press(self, key):
+        for seq, key in (("<Left>", "◀"), ("<Right>", "▶"), ("<Home>", "⇤"),
+                         ("<End>", "⇥"), ("<Control-z>", "↶"), ("<Control-y>", "↷"),
+                         ("<Control-Z>", "↷")):
+            self.bind(seq, lambda e, k=key: self._press(k))
+        self.bind("<<Paste>>",   self._paste)
+        self.bind("<Control-v>", self._paste)
+
+    def _paste(self, _event=None):
         try:
-            self._handle(key)
-        except Exception as ex:
-            self._show_error(str(ex))
+            text = self.clipboard_get()
+        except tk.TclError:
+            return "break"
+        self._deferred = None
+        self.pad.feed(text)
+        self._sync()
+        return "break"
 
-    def _handle(self, key):
-        
-        if key == "MC":
-            self.memory = 0.0; self.mem_var.set(""); return
-        if key == "MR":
-            self._append(str(self.memory)); return
-        if key in ("M+","M−","MS"):
-            val = self._eval_safe()
-            if val is None: return
-            if   key == "MS": self.memory = val
-            elif key == "M+": self.memory += val
-            else:             self.memory -= val
-            self.mem_var.set(f"M={self._fmt(self.memory)}"); return
+    def _toggle_angle(self):
+        self.pad.toggle_angle()
+        self.angle_btn.config(text=self.pad.angle_mode)
 
-        
-        if key == "C":
-            self.expr = ""; self.display_str = ""
-            self.expr_var.set(""); self.result_var.set("0"); return
-        if key == "⌫":
-            self.expr = self.expr[:-1]
-            self.display_str = self.display_str[:-1]
-            self.expr_var.set(self.display_str)
-            self._live_eval(); return
+    def _toggle_exact(self):
+        self.pad.toggle_exact()
+        self.exact_btn.config(text="EXACT" if self.pad.exact else "FLT")
+        self._sync()
 
-        
-        if key == "=":
-            val = self._eval_safe()
-            if val is not None:
-                self.expr_var.set("")
-                self.result_var.set(self._fmt(val))
-                self.last_result = val
-                self.expr = self._fmt(val)
-                self.display_str = self._fmt(val)
-            return
+    def _show_full(self, _event=None):
+        """Open the full digits of an exact result in a separate window.
 
-        
-        if key == "π":  self._append(str(math.pi), "π"); return
-        if key == "e":  self._append(str(math.e),  "e"); return
-        if key == "Ans":
-            if self.last_result is not None:
-                self._append(str(self.last_result), "Ans")
+        The digits are produced on a worker thread and polled with after(),
+        so a huge conversion does not stall the keypad.
+        """
+        if not self.pad.result_is_summary():
             return
-
-        
-        unary = {
-            "sin":   lambda x: math.sin(self._to_rad(x)),
-            "cos":   lambda x: math.cos(self._to_rad(x)),
-            "tan":   lambda x: math.tan(self._to_rad(x)),
-            "sin⁻¹": lambda x: self._from_rad(math.asin(x)),
-            "cos⁻¹": lambda x: self._from_rad(math.acos(x)),
-            "tan⁻¹": lambda x: self._from_rad(math.atan(x)),
-            "log":   math.log10,   "10ˣ": lambda x: 10**x,
-            "ln":    math.log,     "eˣ":  math.exp,
-            "√":     math.sqrt,    "x²":  lambda x: x**2,
-            "∛":     lambda x: x**(1/3), "x³": lambda x: x**3,
-            "1/x":   lambda x: 1/x,
-            "x!":    lambda x: float(math.factorial(int(x))),
-        }
-        if key in unary:
-            val = self._eval_safe()
-            if val is None: return
-            result = unary[key](val)
-            self.expr_var.set(f"{key}({self._fmt(val)})")
-            self.result_var.set(self._fmt(result))
-            self.last_result = result
-            self.expr = self._fmt(result)
-            self.display_str = self._fmt(result)
+        win = tk.Toplevel(self, bg=BG)
+        win.title("Full result")
+        txt = tk.Text(win, bg=DISPLAY_BG, fg=TEXT_MAIN, font=FONT_EXPR,
+                      wrap="char", relief="flat", width=48, height=16)
+        txt.pack(fill="both", expand=True, padx=8, pady=8)
+        txt.insert("1.0", "Converting…")
+        out = []
+        full = self.pad.full_result_text
+        threading.Thread(target=lambda: out.append(full()), daemon=True).start()
+
+        def poll():
+            if not win.winfo_exists(): return
+            if not out:
+                win.after(50, poll); return
+            txt.delete("1.0", "end")
+            txt.insert("1.0", out[0])
+            txt.config(state="disabled")
+        poll()
+
+    def _show_history(self):
+        """Browse and search the history tape; double-click recalls an entry.
+
+        Only the in-memory ring or the first matches of a search are listed,
+        the log itself stays on disk.
+        """
+        tape = self.pad.history
+        if tape is None:
             return
+        win = tk.Toplevel(self, bg=BG)
+        win.title("History")
+        query = tk.StringVar()
+        tk.Entry(win, textvariable=query, bg=DISPLAY_BG, fg=TEXT_MAIN,
+                 font=FONT_EXPR, insertbackground=TEXT_MAIN,
+                 relief="flat").pack(fill="x", padx=8, pady=(8, 4))
+        lb = tk.Listbox(win, bg=DISPLAY_BG, fg=TEXT_MAIN, font=FONT_EXPR,
+                        relief="flat", width=48, height=16, activestyle="none")
+        lb.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        shown = []
+        job = [None]
+
+        def refresh():
+            job[0] = None
+            shown[:] = tape.search(query.get().strip(), limit=200)
+            lb.delete(0, "end")
+            for e in shown:
+                lb.insert("end", f"{e.display} = {e.result}")
+
+        def changed(*_):
+            if job[0] is not None: win.after_cancel(job[0])
+            job[0] = win.after(150, refresh)
+
+        def pick(_event=None):
+            sel = lb.curselection()
+            if not sel: return
+            self._deferred = None
+            self.pad.recall(shown[sel[0]])
+            self._sync()
+            win.destroy()
+
+        query.trace_add("write", changed)
+        lb.bind("<Double-Button-1>", pick)
+        lb.bind("<Return>", pick)
+        refresh()
 
-        if key == "xʸ":  self._append("**", "^");     return
-        if key == "ʸ√x": self._append("**(1/", "^(1/"); return
-        if key == "EXP":  self._append("*10**", "E");  return
+    def _toggle_inv(self):
+        self.pad.toggle_inv()
+        inv_mode = self.pad.inv_mode
+        self.inv_btn.config(bg=BTN_ACCENT if inv_mode else BTN_SCI,
+                            fg=TEXT_MAIN  if inv_mode else TEXT_SCI)
+        self.keypad.relabel(INV_MAP if inv_mode else self.INV_BACK)
 
-        if key == "±":
-            val = self._eval_safe()
-            if val is not None:
-                neg = -val
-                self.expr = self._fmt(neg); self.display_str = self._fmt(neg)
-                self.expr_var.set(self.display_str); self.result_var.set(self._fmt(neg))
+    @instrument()
+    def _press(self, key):
+        pad = self.pad
+        self._deferred = None
+        if pad.exact and key in EVAL_KEYS and pad.needs_value():
+            # Exact results can be huge; evaluate out of process and replay
+            # the key once the value is known.
+            self._deferred = key
+            self._submit()
             return
-
-        if key == "%":
-            val = self._eval_safe()
-            if val is not None:
-                pct = val / 100
-                self.expr = self._fmt(pct); self.display_str = self._fmt(pct)
-                self.expr_var.set(self.display_str); self.result_var.set(self._fmt(pct))
+        pad.press(key)
+        self._sync()
+
+    def _sync(self):
+        pad = self.pad
+        self._render.set(self.expr_var, pad.expr_text)
+        self._render.set(self.result_var, pad.result_text)
+        self._render.set(self.mem_var, pad.mem_text)
+        # Coalesce a burst of keystrokes into one preview once Tk is idle.
+        if pad.preview_due and self._live_job is None:
+            self._live_job = self.after_idle(self._flush_live)
+
+    def _flush_live(self):
+        self._live_job = None
+        if self.pad.exact:
+            self.pad.preview_due = False
+            if self.pad.needs_value(): self._submit()
             return
-
-        
-        op_map = {"×": "*", "÷": "/", "−": "-"}
-        raw = op_map.get(key, key)
-        DISP_OPS = {"+", "−", "×", "÷", "^"}
-        RAW_OPS  = {"+", "-", "*", "/"}
-        if (key in DISP_OPS or raw in RAW_OPS) and self.expr:
-            for op in ("**", "*", "/", "+", "-"):
-                if self.expr.endswith(op):
-                    self.expr = self.expr[:-len(op)]; break
-            for op in ("^(1/", "^", "×", "÷", "−", "+", "-", "*", "/"):
-                if self.display_str.endswith(op):
-                    self.display_str = self.display_str[:-len(op)]; break
-
-        self._append(raw, key)
-
-    def _append(self, raw, display=None):
-        if display is None: display = raw
-        self.expr += raw
-        self.display_str += display
-        self.expr_var.set(self.display_str)
-        self._live_eval()
-
-    def _live_eval(self):
-        val = self._eval_safe(silent=True)
-        if val is not None:
-            self.result_var.set(self._fmt(val))
-
-    def _eval_safe(self, silent=False):
-        try:
-            if not self.expr.strip(): return None
-            result = eval(self.expr, {"__builtins__": {}},
-                          {"math": math, "pi": math.pi, "e": math.e})
-            return float(result)
-        except:
-            if not silent: self._show_error("Syntax Error")
-            return None
-
-    def _show_error(self, msg):
-        self.result_var.set("Error")
-        self.expr_var.set(msg)
-        self.expr = ""; self.display_str = ""
-
-    @staticmethod
-    def _fmt(val):
-        if val == int(val) and abs(val) < 1e15:
-            return str(int(val))
-        return f"{val:.10g}"
+        self.pad.preview()
+        self._render.set(self.result_var, self.pad.result_text)
+
+    def _submit(self):
+        if self._worker is None:
+            self._worker = EvalWorker()
+        req = self.pad.eval_request()
+        if req == self._request and self._worker.busy:
+            return                          # already being evaluated
+        self._request = req
+        self._worker.submit(*req)
+        if self._poll_job is None:
+            self._poll_job = self.after(5, self._poll_worker)
+
+    def _poll_worker(self):
+        self._poll_job = None
+        res = self._worker.poll()
+        if res is None:
+            if self._worker.busy:
+                self._poll_job = self.after(10, self._poll_worker)
+            return
+        _, ok, val = res
+        key, self._deferred = self._deferred, None
+        if ok:
+            self.pad.remember(self._request, val)
+            if key is not None: self.pad.press(key)
+        elif key is not None:
+            self.pad.fail(val)
+        self._sync()
+
+    def destroy(self):
+        if self._worker is not None:
+            self._worker.close()
+        if self.pad.history is not None:
+            self.pad.history.close()
+        if self.pad.recorder is not None:
+            self.pad.recorder.close()
+        super().destroy()
 
 
 
 class BasePage(tk.Frame):
+    EVICTABLE = True
+
     def __init__(self, parent, controller, title, icon=""):
         super().__init__(parent, bg=BG)
         self.controller = controller
@@ -520,12 +724,6 @@ class BasePage(tk.Frame):
         tk.Label(self.body, text=label, bg=BG, fg=TEXT_SUB,
                  font=FONT_LABEL).grid(row=row, column=0, sticky="w", pady=8)
         var = tk.StringVar(value=options[0])
-        style = ttk.Style()
-        style.theme_use("clam")
-        style.configure("Dark.TCombobox",
-                        fieldbackground=DISPLAY_BG, background=DISPLAY_BG,
-                        foreground=TEXT_MAIN, arrowcolor=TEXT_ACCENT,
-                        selectbackground=DISPLAY_BG, selectforeground=TEXT_MAIN)
         cb = ttk.Combobox(self.body, textvariable=var, values=options,
                           state="readonly", font=("Courier New", 11),
                           style="Dark.TCombobox")
@@ -557,11 +755,8 @@ class BMIPage(BasePage):
 
     def _calc(self):
         try:
-            w = float(self.weight.get()); h = float(self.height.get()) / 100
-            bmi = round(w / h**2, 2)
-            cat = ("Underweight" if bmi < 18.5 else "Normal weight" if bmi < 25
-                   else "Overweight" if bmi < 30 else "Obese")
-            self.res.config(text=f"BMI  {bmi}\n{cat}")
+            val, cat = bmi(float(self.weight.get()), float(self.height.get()))
+            self.res.config(text=f"BMI  {val}\n{cat}")
         except: self.res.config(text="Invalid input")
 
 
@@ -573,14 +768,12 @@ class AgePage(BasePage):
         self.res = self._result_lbl(2)
 
     def _calc(self):
+        try:    dob = parse_date(self.dob.get())
+        except: self.res.config(text="Use format  YYYY-MM-DD"); return
         try:
-            dob   = datetime.strptime(self.dob.get(), "%Y-%m-%d").date()
-            today = date.today()
-            yrs   = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-            mos   = (today.month - dob.month) % 12
-            days  = abs((today - dob.replace(year=today.year)).days) % 30
+            yrs, mos, days = age(dob)
             self.res.config(text=f"{yrs} yrs  {mos} mos  {days} days")
-        except: self.res.config(text="Use format  YYYY-MM-DD")
+        except ValueError: self.res.config(text="Date of birth is in the future")
 
 
 class DiscountPage(BasePage):
@@ -593,32 +786,27 @@ class DiscountPage(BasePage):
 
     def _calc(self):
         try:
-            p = float(self.price.get()); d = float(self.discount.get())
-            saved = round(p * d / 100, 2); final = round(p - saved, 2)
+            saved, final = discount(float(self.price.get()),
+                                    float(self.discount.get()))
             self.res.config(text=f"Save  {saved}\nFinal  {final}")
         except: self.res.config(text="Invalid input")
 
 
 class _UnitPage(BasePage):
-    UNITS = {}
-    def __init__(self, p, c, title, icon, base_unit):
+    CATEGORY = None
+    def __init__(self, p, c, title, icon):
         super().__init__(p, c, title, icon)
-        self.base_unit = base_unit
         self.val  = self._entry("Value", 0)
-        opts = list(self.UNITS.keys())
+        opts = list(UNITS[self.CATEGORY])
         self.frm  = self._dropdown("From", opts, 1)
         self.to_  = self._dropdown("To",   opts, 2)
         self._calc_btn("Convert", self._calc, 3)
         self.res  = self._result_lbl(4)
 
-    def _to_base(self, v, unit):  return v / self.UNITS[unit]
-    def _from_base(self, v, unit): return v * self.UNITS[unit]
-
     def _calc(self):
         try:
-            v   = float(self.val.get())
-            base = self._to_base(v, self.frm.get())
-            result = self._from_base(base, self.to_.get())
+            result = convert_unit(float(self.val.get()), self.CATEGORY,
+                                  self.frm.get(), self.to_.get())
             self.res.config(text=f"{round(result, 8)}  {self.to_.get()}")
         except: self.res.config(text="Invalid input")
 
@@ -627,7 +815,7 @@ class TemperaturePage(BasePage):
     def __init__(self, p, c):
         super().__init__(p, c, "Temperature", "🌡")
         self.val  = self._entry("Value", 0)
-        opts = ["Celsius", "Fahrenheit", "Kelvin"]
+        opts = list(TEMPERATURE_UNITS)
         self.frm  = self._dropdown("From", opts, 1)
         self.to_  = self._dropdown("To",   opts, 2)
         self._calc_btn("Convert", self._calc, 3)
@@ -635,65 +823,55 @@ class TemperaturePage(BasePage):
 
     def _calc(self):
         try:
-            v  = float(self.val.get()); fr = self.frm.get(); to = self.to_.get()
-            c  = (v if fr=="Celsius" else (v-32)*5/9 if fr=="Fahrenheit" else v-273.15)
-            r  = (c if to=="Celsius" else c*9/5+32 if to=="Fahrenheit" else c+273.15)
+            to = self.to_.get()
+            r  = convert_temperature(float(self.val.get()), self.frm.get(), to)
             self.res.config(text=f"{round(r,4)}  {to}")
         except: self.res.config(text="Invalid input")
 
 
 class SpeedPage(_UnitPage):
-    UNITS = {"m/s":1,"km/h":3.6,"mph":2.23694,"knots":1.94384,"ft/s":3.28084}
-    def __init__(self, p, c): super().__init__(p, c, "Speed", "🚀", "m/s")
-    def _to_base(self, v, u): return v / self.UNITS[u]
-    def _from_base(self, v, u): return v * self.UNITS[u]
+    CATEGORY = "speed"
+    def __init__(self, p, c): super().__init__(p, c, "Speed", "🚀")
 
 
 class LengthPage(_UnitPage):
-    UNITS = {"m":1,"km":0.001,"cm":100,"mm":1000,"mile":0.000621371,
-             "yard":1.09361,"foot":3.28084,"inch":39.3701,"nm":0.000539957}
-    def __init__(self, p, c): super().__init__(p, c, "Length", "📏", "m")
-    def _to_base(self, v, u): return v / self.UNITS[u]
-    def _from_base(self, v, u): return v * self.UNITS[u]
+    CATEGORY = "length"
+    def __init__(self, p, c): super().__init__(p, c, "Length", "📏")
 
 
 class MassPage(_UnitPage):
-    UNITS = {"kg":1,"g":1000,"mg":1e6,"lb":2.20462,"oz":35.274,
-             "ton":0.001,"stone":0.157473}
-    def __init__(self, p, c): super().__init__(p, c, "Mass", "🏋", "kg")
-    def _to_base(self, v, u): return v / self.UNITS[u]
-    def _from_base(self, v, u): return v * self.UNITS[u]
+    CATEGORY = "mass"
+    def __init__(self, p, c): super().__init__(p, c, "Mass", "🏋")
 
 
 class AreaPage(_UnitPage):
-    UNITS = {"m²":1,"km²":1e-6,"cm²":1e4,"mm²":1e6,"hectare":1e-4,
-             "acre":0.000247105,"ft²":10.7639,"in²":1550,"yd²":1.19599}
-    def __init__(self, p, c): super().__init__(p, c, "Area", "📐", "m²")
-    def _to_base(self, v, u): return v / self.UNITS[u]
-    def _from_base(self, v, u): return v * self.UNITS[u]
+    CATEGORY = "area"
+    def __init__(self, p, c): super().__init__(p, c, "Area", "📐")
 
 
 class VolumePage(_UnitPage):
-    UNITS = {"L":1,"mL":1000,"m³":0.001,"cm³":1000,"gallon":0.264172,
-             "quart":1.05669,"pint":2.11338,"cup":4.22675,"fl oz":33.814}
-    def __init__(self, p, c): super().__init__(p, c, "Volume", "🧪", "L")
-    def _to_base(self, v, u): return v / self.UNITS[u]
-    def _from_base(self, v, u): return v * self.UNITS[u]
+    CATEGORY = "volume"
+    def __init__(self, p, c): super().__init__(p, c, "Volume", "🧪")
 
 
 class DataPage(_UnitPage):
-    UNITS = {"bit":1,"byte":8,"KB":8e3,"MB":8e6,"GB":8e9,"TB":8e12,"PB":8e15}
-    def __init__(self, p, c): super().__init__(p, c, "Data", "💾", "bit")
-    def _to_base(self, v, u): return v * self.UNITS[u]
-    def _from_base(self, v, u): return v / self.UNITS[u]
+    CATEGORY = "data"
+    def __init__(self, p, c): super().__init__(p, c, "Data", "💾")
 
 
 class TimePage(_UnitPage):
-    UNITS = {"second":1,"minute":60,"hour":3600,"day":86400,
-             "week":604800,"month":2.628e6,"year":3.156e7,"millisecond":0.001}
-    def __init__(self, p, c): super().__init__(p, c, "Time", "⏱", "second")
-    def _to_base(self, v, u): return v * self.UNITS[u]
-    def _from_base(self, v, u): return v / self.UNITS[u]
+    CATEGORY = "time"
+    def __init__(self, p, c): super().__init__(p, c, "Time", "⏱")
+
+
+class FuelPage(_UnitPage):
+    CATEGORY = "fuel"
+    def __init__(self, p, c): super().__init__(p, c, "Fuel Economy", "⛽")
+
+
+class BandwidthPage(_UnitPage):
+    CATEGORY = "bandwidth"
+    def __init__(self, p, c): super().__init__(p, c, "Bandwidth", "📶")
 
 
 class DatePage(BasePage):
@@ -706,36 +884,323 @@ class DatePage(BasePage):
 
     def _calc(self):
         try:
-            d1 = datetime.strptime(self.d1.get(), "%Y-%m-%d").date()
-            d2 = datetime.strptime(self.d2.get(), "%Y-%m-%d").date()
-            diff = abs((d2 - d1).days)
-            self.res.config(text=f"{diff} days\n≈ {round(diff/7,1)} weeks"
-                                  f"  ≈ {round(diff/30.44,1)} months")
+            days, (wk, wd), (y, m, d) = date_breakdown(parse_date(self.d1.get()),
+                                                       parse_date(self.d2.get()))
+            self.res.config(text=f"{days} days  =  {wk} wks {wd} d\n"
+                                  f"{y} yrs  {m} mos  {d} days")
         except: self.res.config(text="Use format  YYYY-MM-DD")
 
 
 class NumeralPage(BasePage):
+    SHOW_DIGITS = 2000          # longer results are abbreviated on screen
+
     def __init__(self, p, c):
         super().__init__(p, c, "Numeral System", "🔢")
         self.val  = self._entry("Value", 0)
-        opts = ["Decimal", "Binary", "Octal", "Hexadecimal"]
+        opts = list(NUMERAL_BASES)
         self.frm  = self._dropdown("From", opts, 1)
         self.to_  = self._dropdown("To",   opts, 2)
-        self._calc_btn("Convert", self._calc, 3)
-        self.res  = self._result_lbl(4)
+        self.width = self._entry("Bits (two's compl.)", 3)
+        self._calc_btn("Convert", self._calc, 4)
+        self._calc_btn("Convert file…", self._calc_file, 5)
+        self.res  = self._result_lbl(6)
+
+    def _bits(self):
+        w = self.width.get().strip()
+        return int(w) if w else None
 
     def _calc(self):
-        base = {"Decimal":10,"Binary":2,"Octal":8,"Hexadecimal":16}
         try:
-            v    = int(self.val.get(), base[self.frm.get()])
-            to_b = base[self.to_.get()]
-            r    = (str(v) if to_b==10 else bin(v) if to_b==2
-                    else oct(v) if to_b==8 else hex(v))
+            r = convert_numeral(self.val.get(), self.frm.get(), self.to_.get(),
+                                self._bits())
+            if len(r) > self.SHOW_DIGITS:
+                r = f"{r[:40]}…{r[-40:]}\n({len(r)} characters)"
             self.res.config(text=r)
+        except OverflowError as ex: self.res.config(text=str(ex))
         except: self.res.config(text="Invalid input for selected base")
 
+    def _calc_file(self):
+        """Stream a file holding one number into another, off the Tk thread."""
+        src = filedialog.askopenfilename(parent=self, title="Number to convert")
+        if not src: return
+        dst = filedialog.asksaveasfilename(parent=self, title="Save result as")
+        if not dst: return
+        try:
+            args = (self.frm.get(), self.to_.get(), self._bits())
+        except ValueError:
+            self.res.config(text="Invalid bit width"); return
+        out = []
+
+        def work():
+            try:
+                with open(src, encoding="utf-8") as f, \
+                     open(dst, "w", encoding="utf-8") as g:
+                    out.append(f"{convert_numeral_file(f, g, *args)} digits written")
+            except OverflowError as ex:
+                out.append(str(ex))
+            except (OSError, ValueError):
+                out.append("Invalid input for selected base")
+
+        self.res.config(text="Converting…")
+        threading.Thread(target=work, daemon=True).start()
+
+        def poll():
+            if not self.winfo_exists(): return
+            if not out:
+                self.after(100, poll); return
+            self.res.config(text=out[0])
+        poll()
+
+
+class PlotPage(BasePage):
+    """Plot y = f(x); drag to pan, wheel to zoom (Shift: y only)."""
+    PAD = 1e4                   # canvas coordinates are clamped to ±PAD
+
+    def __init__(self, p, c):
+        super().__init__(p, c, "Plot", "📈")
+        self.expr = self._entry("f(x) =", 0)
+        self.expr.insert(0, "sin(x)")
+        self.expr.bind("<Return>", lambda e: self._calc())
+        self._calc_btn("Plot", self._calc, 1)
+        self.info = tk.Label(self.body, text="", bg=BG, fg=TEXT_SUB,
+                             font=FONT_LABEL, anchor="w")
+        self.info.grid(row=2, column=0, columnspan=2, sticky="ew")
+        self.canvas = tk.Canvas(self.body, bg=DISPLAY_BG, highlightthickness=0)
+        self.canvas.grid(row=3, column=0, columnspan=2, sticky="nsew", pady=(6, 0))
+        self.body.rowconfigure(3, weight=1)
+
+        self.sampler = None
+        self.view    = [-360.0, 360.0, -1.5, 1.5]     # x0, x1, y0, y1
+        self._lines  = []
+        self._axes   = (self.canvas.create_line(0, 0, 0, 0, fill="#3a3a3c"),
+                        self.canvas.create_line(0, 0, 0, 0, fill="#3a3a3c"))
+        self._drag   = None
+        self._job    = None
+
+        cv = self.canvas
+        cv.bind("<Configure>",       lambda e: self._schedule())
+        cv.bind("<ButtonPress-1>",   self._drag_start)
+        cv.bind("<B1-Motion>",       self._drag_move)
+        cv.bind("<MouseWheel>",      lambda e: self._zoom(e, 0.8 if e.delta > 0 else 1.25))
+        cv.bind("<Button-4>",        lambda e: self._zoom(e, 0.8))
+        cv.bind("<Button-5>",        lambda e: self._zoom(e, 1.25))
+        self.after_idle(self._calc)
+
+    def _angle_mode(self):
+        sci = self.controller.pages.get(ScientificPage)
+        return sci.pad.angle_mode if sci is not None else "DEG"
+
+    def _calc(self):
+        mode = self._angle_mode()
+        try:
+            self.sampler = PlotSampler(self.expr.get().strip(), mode)
+        except Exception:
+            self.sampler = None
+            self.info.config(text="Syntax Error"); self._redraw(); return
+        x0, x1 = (-360.0, 360.0) if mode == "DEG" else (-400.0, 400.0) \
+            if mode == "GRAD" else (-2 * math.pi, 2 * math.pi)
+        self.view[:2] = x0, x1
+        self._autoscale()
+        self.info.config(text=f"{mode}   drag: pan   wheel: zoom   shift+wheel: y")
+        self._redraw()
+
+    def _autoscale(self):
+        w = max(self.canvas.winfo_width(), 100)
+        _, lo, hi = self.sampler.columns(self.view[0], self.view[1], w)
+        ys = sorted(v for v in lo + hi if math.isfinite(v))
+        if not ys: return
+        # ignore the outermost 2% so poles do not flatten the curve
+        a, b = ys[len(ys) // 50], ys[-1 - len(ys) // 50]
+        if b - a < 1e-12: a, b = a - 1, b + 1
+        m = (b - a) * 0.1
+        self.view[2:] = a - m, b + m
+
+    def _schedule(self):
+        if self._job is None:
+            self._job = self.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._job = None
+        cv = self.canvas
+        W, H = cv.winfo_width(), cv.winfo_height()
+        x0, x1, y0, y1 = self.view
+        sx, sy = W / (x1 - x0), H / (y1 - y0)
+        lim = self.PAD
+        px = lambda x: x * sx - x0 * sx
+        py = lambda y: min(lim, max(-lim, H - (y - y0) * sy))
+        cv.coords(self._axes[0], 0, py(0.0), W, py(0.0))
+        cv.coords(self._axes[1], px(0.0), 0, px(0.0), H)
+
+        segs, cur = [], []
+        if self.sampler is not None:
+            for x, lo, hi in zip(*self.sampler.columns(x0, x1, W)):
+                if lo != lo:                # NaN column: break the line
+                    if len(cur) >= 4: segs.append(cur)
+                    cur = []
+                    continue
+                X = px(x)
+                cur += (X, py(hi), X, py(lo))
+        if len(cur) >= 4: segs.append(cur)
+
+        # reuse line items; create or drop only the difference
+        while len(self._lines) < len(segs):
+            self._lines.append(cv.create_line(0, 0, 0, 0, fill=TEXT_ACCENT, width=1))
+        for item, seg in zip(self._lines, segs):
+            cv.coords(item, *seg)
+        for item in self._lines[len(segs):]:
+            cv.delete(item)
+        del self._lines[len(segs):]
+
+    def _drag_start(self, e):
+        self._drag = (e.x, e.y, list(self.view))
+
+    def _drag_move(self, e):
+        if self._drag is None: return
+        x, y, (x0, x1, y0, y1) = self._drag
+        dx = (e.x - x) * (x1 - x0) / max(self.canvas.winfo_width(), 1)
+        dy = (e.y - y) * (y1 - y0) / max(self.canvas.winfo_height(), 1)
+        self.view[:] = x0 - dx, x1 - dx, y0 + dy, y1 + dy
+        self._schedule()
+
+    def _zoom(self, e, f):
+        W, H = max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+        x0, x1, y0, y1 = self.view
+        cx = x0 + e.x / W * (x1 - x0)
+        cy = y1 - e.y / H * (y1 - y0)
+        if not e.state & 1:                 # Shift held: y axis only
+            self.view[0:2] = cx + (x0 - cx) * f, cx + (x1 - cx) * f
+        self.view[2:4] = cy + (y0 - cy) * f, cy + (y1 - cy) * f
+        self._schedule()
+        return "break"
+
+
+class SweepPage(BasePage):
+    """Write a BMI / discount / expression table over x × y grids to a file."""
+    KINDS = {"BMI  (x kg × y cm)": "bmi",
+             "Discount  (x price × y %)": "discount",
+             "Expression  f(x, y)": "expr"}
+
+    def __init__(self, p, c):
+        super().__init__(p, c, "Parameter Sweep", "🧮")
+        self.kind = self._dropdown("Table", list(self.KINDS), 0)
+        self.expr = self._entry("f(x, y) =", 1)
+        self.expr.insert(0, "sin(x)*y")
+        self.xs   = self._entry("x  (start:stop:n)", 2)
+        self.xs.insert(0, "40:150:111")
+        self.ys   = self._entry("y  (start:stop:n)", 3)
+        self.ys.insert(0, "140:210:71")
+        self._calc_btn("Write table…", self._calc, 4)
+        self.res  = self._result_lbl(5)
+        self._state = None          # [done, total, message, cancel] shared with the worker
+
+    def _calc(self):
+        if self._state is not None:     # a second press cancels the running sweep
+            self._state[3] = True; return
+        kind = self.KINDS[self.kind.get()]
+        try:
+            xs = calc_sweep.grid(self.xs.get())
+            ys = calc_sweep.grid(self.ys.get()) if self.ys.get().strip() else None
+        except: self.res.config(text="Invalid grid"); return
+        dst = filedialog.asksaveasfilename(
+            parent=self, title="Save table as", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("NumPy array", "*.npy")])
+        if not dst: return
+        sci = self.controller.pages.get(ScientificPage)
+        mode = sci.pad.angle_mode if sci is not None else "DEG"
+        text = self.expr.get()          # Tk is only touched on this thread
+        state = self._state = [0, len(xs), None, False]
+
+        def progress(done, total): state[0] = done
+
+        def work():
+            # Any failure must set state[2], or poll() would wait forever.
+            try:
+                rows = calc_sweep.run_sweep(kind, xs, ys, dst, text,
+                                            mode, progress=progress,
+                                            cancel=lambda: state[3])
+                state[2] = "Cancelled" if state[3] else f"{rows} rows written"
+            except SyntaxError: state[2] = "Syntax Error"
+            except ArithmeticError: state[2] = "Math Error"
+            except Exception as ex: state[2] = str(ex) or "Sweep failed"
+
+        self.res.config(text="Starting…")
+        threading.Thread(target=work, daemon=True).start()
+
+        def poll():
+            if not self.winfo_exists(): state[3] = True; return
+            if state[2] is None:
+                self.res.config(text=f"{state[0]} / {state[1]} rows   (press again to cancel)")
+                self.after(100, poll); return
+            self._state = None
+            self.res.config(text=state[2])
+        poll()
+
+
+class SolverPage(BasePage):
+    """Roots, extrema and definite integrals of f(x) on [a, b]."""
+    TASKS = ("Roots", "Extrema", "Integral")
+    SHOW = 8                    # list at most this many roots / extrema
+
+    def __init__(self, p, c):
+        super().__init__(p, c, "Solver", "ƒ")
+        self.expr = self._entry("f(x) =", 0)
+        self.expr.insert(0, "sin(x)-0.5")
+        self.a    = self._entry("From  a", 1)
+        self.a.insert(0, "0")
+        self.b    = self._entry("To  b", 2)
+        self.b.insert(0, "360")
+        self.task = self._dropdown("Find", list(self.TASKS), 3)
+        self._calc_btn("Solve", self._calc, 4)
+        self.res  = self._result_lbl(5)
+        for e in (self.expr, self.a, self.b):
+            e.bind("<Return>", lambda e: self._calc())
+
+    def _angle_mode(self):
+        sci = self.controller.pages.get(ScientificPage)
+        return sci.pad.angle_mode if sci is not None else "DEG"
+
+    def _listing(self, lines):
+        more = len(lines) - self.SHOW
+        if more > 0: lines = lines[:self.SHOW] + [f"… {more} more"]
+        return "\n".join(lines)
+
+    def _calc(self):
+        mode, text = self._angle_mode(), self.expr.get().strip()
+        try:
+            a = float(evaluate(self.a.get(), mode))
+            b = float(evaluate(self.b.get(), mode))
+        except: self.res.config(text="Invalid bounds"); return
+        task = self.task.get()
+        try:
+            if task == "Roots":
+                roots = find_roots(text, a, b, mode)
+                out = self._listing([f"x = {fmt(r)}" for r in roots]) or "No roots"
+            elif task == "Extrema":
+                ext = find_extrema(text, a, b, mode)
+                out = self._listing([f"{k}  x = {x:.7g}   y = {fmt(y)}"
+                                     for x, y, k in ext]) or "No extrema"
+            else:
+                val, err = integrate(text, a, b, mode)
+                out = f"∫ = {fmt(val)}\n± {err:.1e}"
+        except SyntaxError: out = "Syntax Error"
+        except ValueError as ex: out = str(ex).capitalize()
+        except ArithmeticError: out = "Math Error"
+        self.res.config(text=f"{out}\n({mode})")
+
+
+for _page in (HomePage, ScientificPage, BMIPage, AgePage, DiscountPage,
+              TemperaturePage, SpeedPage, LengthPage, MassPage, AreaPage,
+              VolumePage, DataPage, TimePage, FuelPage, BandwidthPage,
+              DatePage, NumeralPage, PlotPage, SweepPage, SolverPage):
+    instrument_methods(_page, "__init__", "_calc")
+
 
 # ════════════════════════════════════════════════════════════════════════════
 if __name__ == "__main__":
+    # Any arguments select the headless batch converter, e.g.
+    #   python calculator_GUI.py length km mile readings.csv
+    if len(sys.argv) > 1:
+        from calc_cli import main
+        sys.exit(main(sys.argv[1:]))
     app = App()
     app.mainloop()